@@ -0,0 +1,29 @@
+"""media created at
+
+Revision ID: 0a4c7e9b2f16
+Revises: f6b2d8e0a713
+Create Date: 2026-10-18 16:12:37.504918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a4c7e9b2f16'
+down_revision: Union[str, None] = 'f6b2d8e0a713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие строки получают время миграции и попадают под сборку не раньше, чем истечет грейс-период
+    op.add_column('medias', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('medias', 'created_at')
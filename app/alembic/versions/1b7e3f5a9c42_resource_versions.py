@@ -0,0 +1,30 @@
+"""resource versions
+
+Revision ID: 1b7e3f5a9c42
+Revises: 0a4c7e9b2f16
+Create Date: 2026-10-18 16:48:05.217390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e3f5a9c42'
+down_revision: Union[str, None] = '0a4c7e9b2f16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('tweets', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tweets', 'version')
+    op.drop_column('users', 'version')
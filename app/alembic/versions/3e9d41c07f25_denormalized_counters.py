@@ -0,0 +1,55 @@
+"""denormalized counters
+
+Revision ID: 3e9d41c07f25
+Revises: a1bcf37ba863
+Create Date: 2026-10-18 11:02:17.284903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e9d41c07f25'
+down_revision: Union[str, None] = 'a1bcf37ba863'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tweets', sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('followers_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('following_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('tweets_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE tweets t SET likes_count = s.total
+        FROM (SELECT tweet_id, count(*) AS total FROM likes GROUP BY tweet_id) s
+        WHERE t.id = s.tweet_id
+    """)
+    op.execute("""
+        UPDATE users u SET followers_count = s.total
+        FROM (SELECT following_id, count(*) AS total FROM follows GROUP BY following_id) s
+        WHERE u.id = s.following_id
+    """)
+    op.execute("""
+        UPDATE users u SET following_count = s.total
+        FROM (SELECT follower_id, count(*) AS total FROM follows GROUP BY follower_id) s
+        WHERE u.id = s.follower_id
+    """)
+    op.execute("""
+        UPDATE users u SET tweets_count = s.total
+        FROM (SELECT user_id, count(*) AS total FROM tweets GROUP BY user_id) s
+        WHERE u.id = s.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tweets_count')
+    op.drop_column('users', 'following_count')
+    op.drop_column('users', 'followers_count')
+    op.drop_column('tweets', 'likes_count')
@@ -0,0 +1,40 @@
+"""media blobs
+
+Revision ID: 7c2f0d9e4b18
+Revises: 3e9d41c07f25
+Create Date: 2026-10-18 12:40:05.918227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f0d9e4b18'
+down_revision: Union[str, None] = '3e9d41c07f25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_blobs',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('file_path', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('digest')
+    )
+    op.add_column('medias', sa.Column('digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_medias_digest'), 'medias', ['digest'], unique=False)
+    op.create_foreign_key('medias_digest_fkey', 'medias', 'media_blobs', ['digest'], ['digest'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('medias_digest_fkey', 'medias', type_='foreignkey')
+    op.drop_index(op.f('ix_medias_digest'), table_name='medias')
+    op.drop_column('medias', 'digest')
+    op.drop_table('media_blobs')
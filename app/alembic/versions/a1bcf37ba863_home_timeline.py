@@ -0,0 +1,49 @@
+"""home timeline
+
+Revision ID: a1bcf37ba863
+Revises: 5b889c822b8c
+Create Date: 2026-10-18 10:12:41.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1bcf37ba863'
+down_revision: Union[str, None] = '5b889c822b8c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('timelines',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tweet_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tweet_id'], ['tweets.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'tweet_id')
+    )
+    op.create_index(op.f('ix_timelines_tweet_id'), 'timelines', ['tweet_id'], unique=False)
+
+    # Заполняем ленты из существующих подписок: не больше 800 последних твитов на пользователя
+    op.execute("""
+        INSERT INTO timelines (user_id, tweet_id)
+        SELECT follower_id, tweet_id
+        FROM (
+            SELECT f.follower_id, t.id AS tweet_id,
+                   row_number() OVER (PARTITION BY f.follower_id ORDER BY t.id DESC) AS position
+            FROM follows f
+            JOIN tweets t ON t.user_id = f.following_id
+        ) ranked
+        WHERE position <= 800
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_timelines_tweet_id'), table_name='timelines')
+    op.drop_table('timelines')
@@ -0,0 +1,30 @@
+"""media variants
+
+Revision ID: b84e6a1d5c07
+Revises: 7c2f0d9e4b18
+Create Date: 2026-10-18 13:25:49.061733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84e6a1d5c07'
+down_revision: Union[str, None] = '7c2f0d9e4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('medias', sa.Column('thumbnail_path', sa.String(), nullable=True))
+    op.add_column('medias', sa.Column('medium_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('medias', 'medium_path')
+    op.drop_column('medias', 'thumbnail_path')
@@ -0,0 +1,33 @@
+"""tweet score
+
+Revision ID: d5e1f7a2c914
+Revises: b84e6a1d5c07
+Create Date: 2026-10-18 14:02:11.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1f7a2c914'
+down_revision: Union[str, None] = 'b84e6a1d5c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tweets', sa.Column('score', sa.Float(), server_default='0', nullable=False))
+    # Формула db.ranking.tweet_score при FEED_RANK_HALF_LIFE_HOURS = 24
+    op.execute(
+        "UPDATE tweets SET score = "
+        "ln(likes_count + 1) / ln(2) + extract(epoch from created_at)::float8 / 86400"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tweets', 'score')
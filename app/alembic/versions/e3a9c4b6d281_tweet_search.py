@@ -0,0 +1,36 @@
+"""tweet search
+
+Revision ID: e3a9c4b6d281
+Revises: d5e1f7a2c914
+Create Date: 2026-10-18 14:31:57.126930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c4b6d281'
+down_revision: Union[str, None] = 'd5e1f7a2c914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tweets', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', content)", persisted=True),
+        nullable=False
+    ))
+    op.create_index('ix_tweets_search_vector', 'tweets', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tweets_search_vector', table_name='tweets', postgresql_using='gin')
+    op.drop_column('tweets', 'search_vector')
@@ -0,0 +1,41 @@
+"""hot path indexes
+
+Revision ID: f6b2d8e0a713
+Revises: e3a9c4b6d281
+Create Date: 2026-10-18 15:04:22.871364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b2d8e0a713'
+down_revision: Union[str, None] = 'e3a9c4b6d281'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_tweets_user_id_created_at_id', 'tweets', ['user_id', 'created_at', 'id']),
+    ('ix_follows_following_id_follower_id', 'follows', ['following_id', 'follower_id']),
+    ('ix_likes_tweet_id_user_id', 'likes', ['tweet_id', 'user_id']),
+    ('ix_tweets_medias_media_id', 'tweets_medias', ['media_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
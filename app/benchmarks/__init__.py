@@ -0,0 +1,5 @@
+"""
+Пакет `benchmarks` содержит замеры производительности:
+- serialization.py: сравнение путей сериализации ленты
+- load.py: нагрузочный тест API с перцентилями задержек и сравнением прогонов
+"""
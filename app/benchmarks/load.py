@@ -0,0 +1,298 @@
+"""
+Нагрузочный тест API.
+
+Гоняет смесь запросов (лента, профиль, /me, твиты, лайки, подписки, загрузка
+медиа) с заданной конкурентностью либо в процессе через httpx.ASGITransport,
+либо по сети к запущенному uvicorn (--url). Для каждой операции считает
+пропускную способность и задержки p50/p95/p99, сохраняет результат в JSON
+и сравнивает с базовым прогоном: рост выбранного перцентиля для операций
+из --gate больше --max-regression завершает процесс с кодом 1.
+
+Пользователи берутся с API-ключами `user<id>`, как их создает
+tools.generate_data.
+
+Запуск из каталога app:
+    python -m benchmarks.load --users 100000 --concurrency 64 --duration 60 --output run.json
+    python -m benchmarks.load --url http://localhost:8000 --baseline run.json --gate feed,me
+"""
+from httpx import AsyncClient, ASGITransport, Limits
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import random
+import struct
+import json
+import time
+import zlib
+import sys
+
+
+OPERATIONS = ("feed", "profile", "me", "like", "tweet", "follow", "upload")
+
+DEFAULT_MIX = "feed=50,profile=10,me=10,like=12,tweet=8,follow=5,upload=5"
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+PNG_IMAGE = (
+    b"\x89PNG\r\n\x1a\n"
+    + png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0))
+    + png_chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff\xff"))
+    + png_chunk(b"IEND", b"")
+)
+
+
+class Recorder:
+    """
+    Задержки и ошибки по операциям.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.client_errors: Dict[str, int] = {}
+        self.enabled = False
+
+    def record(self, operation: str, seconds: float, status_code: Optional[int]) -> None:
+        if not self.enabled:
+            return
+        self.latencies.setdefault(operation, []).append(seconds)
+        if status_code is None or status_code >= 500:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+        elif status_code >= 400:
+            self.client_errors[operation] = self.client_errors.get(operation, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {
+            operation: summarize(latencies, elapsed, self.errors.get(operation, 0), self.client_errors.get(operation, 0))
+            for operation, latencies in sorted(self.latencies.items())
+        }
+        everything = [value for latencies in self.latencies.values() for value in latencies]
+        total = summarize(everything, elapsed, sum(self.errors.values()), sum(self.client_errors.values()))
+        return {"endpoints": endpoints, "total": total}
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int, client_errors: int) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "client_errors": client_errors,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, mix.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Workload:
+    """
+    Операции нагрузки. Каждая выполняет один HTTP-запрос от имени случайного пользователя.
+    """
+
+    def __init__(self, client: AsyncClient, users: int, max_tweet_id: int) -> None:
+        self.client = client
+        self.users = users
+        self.max_tweet_id = max_tweet_id
+
+    def headers(self, rnd: random.Random) -> dict:
+        return {"api-key": f"user{rnd.randint(1, self.users)}"}
+
+    async def feed(self, rnd: random.Random):
+        return await self.client.get("/api/tweets", params={"limit": 20}, headers=self.headers(rnd))
+
+    async def profile(self, rnd: random.Random):
+        return await self.client.get(f"/api/users/{rnd.randint(1, self.users)}", params={"mode": "counts"})
+
+    async def me(self, rnd: random.Random):
+        return await self.client.get("/api/users/me", params={"mode": "counts"}, headers=self.headers(rnd))
+
+    async def like(self, rnd: random.Random):
+        return await self.client.post(f"/api/tweets/{rnd.randint(1, self.max_tweet_id)}/likes", headers=self.headers(rnd))
+
+    async def tweet(self, rnd: random.Random):
+        return await self.client.post(
+            "/api/tweets",
+            json={"tweet_data": f"load test {rnd.random()}"},
+            headers=self.headers(rnd)
+        )
+
+    async def follow(self, rnd: random.Random):
+        return await self.client.post(f"/api/users/{rnd.randint(1, self.users)}/follow", headers=self.headers(rnd))
+
+    async def upload(self, rnd: random.Random):
+        content = PNG_IMAGE + rnd.randbytes(rnd.randint(1024, 64 * 1024))
+        return await self.client.post(
+            "/api/medias",
+            files={"file": ("load.png", content, "image/png")},
+            headers=self.headers(rnd)
+        )
+
+
+async def worker(workload: Workload, recorder: Recorder, weights: Dict[str, float], seed: str, deadline: float) -> None:
+    rnd = random.Random(seed)
+    names, values = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        operation = rnd.choices(names, weights=values)[0]
+        started_at = time.perf_counter()
+        try:
+            response = await getattr(workload, operation)(rnd)
+            status_code = response.status_code
+        except Exception:
+            status_code = None
+        recorder.record(operation, time.perf_counter() - started_at, status_code)
+
+
+@asynccontextmanager
+async def make_client(url: Optional[str], concurrency: int):
+    if url:
+        async with AsyncClient(base_url=url, timeout=30, limits=Limits(max_connections=concurrency)) as client:
+            yield client
+        return
+
+    from main import app
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=30) as client:
+            yield client
+
+
+async def discover_max_tweet_id() -> int:
+    """
+    Глобальный максимальный ID твита из БД, заданной в настройках (.env).
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy import func, select
+    from core import settings
+    from db import Tweet
+
+    engine = create_async_engine(settings.ASYNC_DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            return await conn.scalar(select(func.max(Tweet.id))) or 1
+    finally:
+        await engine.dispose()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    weights = parse_mix(args.mix)
+    recorder = Recorder()
+
+    async with make_client(args.url, args.concurrency) as client:
+        max_tweet_id = args.max_tweet_id or await discover_max_tweet_id()
+        workload = Workload(client, args.users, max_tweet_id)
+
+        if args.warmup:
+            deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*[
+                worker(workload, recorder, weights, f"{args.seed}:warmup:{index}", deadline)
+                for index in range(args.concurrency)
+            ])
+
+        recorder.enabled = True
+        started_at = time.perf_counter()
+        deadline = started_at + args.duration
+        await asyncio.gather(*[
+            worker(workload, recorder, weights, f"{args.seed}:{index}", deadline)
+            for index in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        "meta": {
+            "target": args.url or "asgi",
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": weights,
+            "users": args.users,
+            "seed": args.seed,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"{'operation':<10} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(result["endpoints"].items()) + [("total", result["total"])]
+    for name, row in rows:
+        print(
+            f"{name:<10} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.1f} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+
+
+def compare(result: dict, baseline: dict, gates: List[str], metric: str, max_regression: float) -> List[str]:
+    """
+    Сравнивает прогон с базовым и возвращает описания регрессий.
+    """
+    regressions = []
+    for operation in gates:
+        current = result["endpoints"].get(operation)
+        previous = baseline["endpoints"].get(operation)
+        if not current or not previous or not previous[metric]:
+            continue
+        change = current[metric] / previous[metric] - 1
+        line = f"{operation} {metric}: {previous[metric]:.2f} ms -> {current[metric]:.2f} ms ({change:+.1%})"
+        print(line)
+        if change > max_regression:
+            regressions.append(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API load test and latency benchmark")
+    parser.add_argument("--url", help="адрес запущенного сервера; без него приложение запускается в процессе")
+    parser.add_argument("--concurrency", type=int, default=32, help="число одновременных клиентов")
+    parser.add_argument("--duration", type=float, default=30, help="длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=5, help="прогрев без учета результатов, с")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса операций: feed=50,like=10,...")
+    parser.add_argument("--users", type=int, default=1000, help="пользователи user1..userN")
+    parser.add_argument("--max-tweet-id", type=int, default=0, help="диапазон ID для лайков (по умолчанию max(id) из БД в .env)")
+    parser.add_argument("--seed", type=int, default=42, help="зерно выбора операций и пользователей")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--gate", default="feed,me", help="операции, регрессия которых валит прогон")
+    parser.add_argument("--gate-metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--max-regression", type=float, default=0.10, help="допустимый рост метрики (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        gates = [name for name in args.gate.split(",") if name]
+        regressions = compare(result, baseline, gates, args.gate_metric, args.max_regression)
+        if regressions:
+            print("Regressions:\n" + "\n".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Микробенчмарк сериализации ленты.
+
+Сравнивает штатный путь FastAPI (словари + jsonable_encoder + json), те же
+словари через orjson и кэшированные фрагменты твитов. БД не нужна: строки
+ленты имитируются простыми объектами с теми же атрибутами, что у ORM.
+
+Запуск из каталога app:
+    python -m benchmarks.serialization --tweets 200 --likes 20 --rounds 200
+"""
+from core.serialization import dumps, encode_tweet, encode_feed, tweet_fragments
+from fastapi.encoders import jsonable_encoder
+from types import SimpleNamespace
+import argparse
+import random
+import timeit
+import json
+
+
+def make_rows(tweets: int, likes: int) -> list:
+    rnd = random.Random(42)
+    rows = []
+    for tweet_id in range(tweets):
+        tweet = SimpleNamespace(
+            id=tweet_id,
+            content="Lorem ipsum dolor sit amet " * rnd.randint(1, 10),
+            user_id=rnd.randint(1, 1000),
+            liked_by=[
+                SimpleNamespace(id=user_id, name=f"user{user_id}")
+                for user_id in range(rnd.randint(0, likes))
+            ],
+        )
+        rows.append((tweet, f"author{tweet.user_id}", [f"/media/ab/{tweet_id:064x}_medium.png"]))
+    return rows
+
+
+def build_dicts(rows: list) -> list:
+    return [
+        {
+            "id": tweet.id,
+            "content": tweet.content,
+            "author": {"id": tweet.user_id, "name": author_name},
+            "likes": [{"user_id": user.id, "name": user.name} for user in tweet.liked_by],
+            "attachments": attachments,
+        }
+        for tweet, author_name, attachments in rows
+    ]
+
+
+def default_path(rows: list) -> bytes:
+    content = jsonable_encoder({"result": True, "tweets": build_dicts(rows), "next_cursor": None})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def orjson_path(rows: list) -> bytes:
+    return dumps({"result": True, "tweets": build_dicts(rows), "next_cursor": None})
+
+
+def fragments_path(rows: list) -> bytes:
+    return encode_feed([encode_tweet(*row) for row in rows], None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Feed serialization micro-benchmark")
+    parser.add_argument("--tweets", type=int, default=200, help="твитов на страницу")
+    parser.add_argument("--likes", type=int, default=20, help="максимум лайков на твит")
+    parser.add_argument("--rounds", type=int, default=200, help="повторов каждого варианта")
+    args = parser.parse_args()
+
+    rows = make_rows(args.tweets, args.likes)
+    assert json.loads(default_path(rows)) == json.loads(orjson_path(rows)) == json.loads(fragments_path(rows))
+
+    tweet_fragments.clear()
+    fragments_path(rows)
+
+    baseline = None
+    variants = (
+        ("jsonable_encoder+json", default_path),
+        ("orjson", orjson_path),
+        ("cached fragments", fragments_path),
+    )
+    for name, func in variants:
+        seconds = min(timeit.repeat(lambda: func(rows), number=args.rounds, repeat=3)) / args.rounds
+        baseline = baseline or seconds
+        print(f"{name:<24} {seconds * 1e3:8.3f} ms/feed  x{baseline / seconds:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
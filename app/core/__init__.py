@@ -2,11 +2,32 @@
 Модуль `core` содержит:
 - config.py: работа с переменными окружения
 - security.py: аутентификация и зависимости безопасности
+- pagination.py: курсоры для keyset-пагинации
+- cache.py: in-process LRU-кэш с TTL
+- query_stats.py: учет SQL-запросов на HTTP-запрос и бюджет запросов
+- storage.py: сохранение загружаемых медиафайлов
+- images.py: фоновая генерация уменьшенных копий изображений
+- media_gc.py: фоновое удаление медиа, не прикрепленных к твитам
+- media_files.py: раздача медиафайлов с кэшированием, ETag и Range
+- serialization.py: быстрая сериализация ответов (orjson, кэш фрагментов твитов)
+- graph.py: граф подписок в памяти процесса
+- metrics.py: метрики в формате Prometheus
+- etag.py: условные GET-запросы (ETag, If-None-Match)
+- profiling.py: выборочное профилирование запросов (pyinstrument, speedscope)
 """
 
 
 from .config import settings, Settings, SettingsConfigDict
-from .security import get_current_user
+from .security import get_current_user, auth_cache
+from .pagination import encode_cursor, decode_cursor
+from .query_stats import QueryStatsMiddleware, QueryStats, current_query_stats
+from .etag import make_etag, etag_matches, not_modified, with_etag
 
 
-__all__ = ["settings", "get_current_user", "Settings", "SettingsConfigDict"]
+__all__ = [
+    "settings", "get_current_user", "Settings", "SettingsConfigDict",
+    "encode_cursor", "decode_cursor",
+    "auth_cache",
+    "QueryStatsMiddleware", "QueryStats", "current_query_stats",
+    "make_etag", "etag_matches", "not_modified", "with_etag",
+]
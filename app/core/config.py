@@ -13,9 +13,90 @@ class Settings(BaseSettings):
     DB_PASS: str
     DB_NAME: str
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    READ_YOUR_WRITES_CACHE_SIZE: int = 100000
+
+    TIMELINE_MAX_SIZE: int = 800
+    FEED_PAGE_SIZE: int = 50
+    FEED_MAX_PAGE_SIZE: int = 200
+    FEED_RANK_HALF_LIFE_HOURS: float = 24.0
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_CANDIDATES: int = 1000
+    FOLLOW_PAGE_SIZE: int = 100
+    FOLLOW_MAX_PAGE_SIZE: int = 1000
+    PROFILE_PREVIEW_MAX: int = 20
+    GRAPH_INDEX_ENABLED: bool = False
+    GRAPH_REFRESH_SECONDS: float = 300.0
+
+    LIKE_WRITE_BEHIND: bool = False
+    LIKE_FLUSH_INTERVAL: float = 0.5
+    LIKE_BATCH_SIZE: int = 1000
+    LIKE_MAX_PENDING: int = 100000
+    LIKE_MAX_RETRIES: int = 5
+    LIKE_RETRY_MAX_BACKOFF: float = 30.0
+
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 60.0
+
+    QUERY_BUDGET: int = 25
+    N_PLUS_ONE_THRESHOLD: int = 10
+
+    MEDIA_DIR: str = "media"
+    MEDIA_TMP_DIR: str = "media_tmp"
+    MEDIA_MAX_SIZE: int = 10 * 1024 * 1024
+    MEDIA_FORM_OVERHEAD: int = 64 * 1024
+    MEDIA_CHUNK_SIZE: int = 256 * 1024
+    MEDIA_VARIANTS_ENABLED: bool = True
+    MEDIA_VARIANT_WORKERS: int = 2
+    MEDIA_VARIANT_QUEUE: int = 64
+    MEDIA_VARIANT_WEBP: bool = False
+    MEDIA_THUMBNAIL_SIZE: int = 320
+    MEDIA_MEDIUM_SIZE: int = 1080
+    MEDIA_CACHE_MAX_AGE: int = 31536000
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = ""
+    MEDIA_GC_ENABLED: bool = True
+    MEDIA_GC_INTERVAL_SECONDS: float = 3600.0
+    MEDIA_GC_GRACE_HOURS: float = 24.0
+    MEDIA_GC_BATCH_SIZE: int = 100
+    MEDIA_GC_FILES_PER_SECOND: float = 50.0
+
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL: float = 0.001
+    PROFILE_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 100
+
+    FAST_JSON: bool = True
+    TWEET_FRAGMENT_CACHE_SIZE: int = 50000
+    TWEET_FRAGMENT_CACHE_TTL: float = 600.0
+
     @property
     def ASYNC_DATABASE_URL(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_REPLICA_URLS(self):
+        urls = []
+        for replica in filter(None, (host.strip() for host in self.DB_REPLICA_HOSTS.split(","))):
+            host, _, port = replica.partition(":")
+            urls.append(
+                f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{host}:{port or self.DB_PORT}/{self.DB_NAME}"
+            )
+        return urls
+
 
 settings = Settings()
@@ -0,0 +1,58 @@
+from fastapi import Request, Response
+from typing import Any
+import hashlib
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Строит слабый ETag по версиям ресурса и параметрам запроса.
+
+    Args:
+        parts: Значения, от которых зависит содержимое ответа
+
+    Returns:
+        str: ETag вида W/"<хэш>"
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Проверяет If-None-Match (слабое сравнение, RFC 9110).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def etag_headers(etag: str, private: bool) -> dict:
+    """
+    Заголовки ответа с ETag: клиент кэширует ответ, но каждый раз перепроверяет его.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if private:
+        headers["Vary"] = "api-key"
+    return headers
+
+
+def not_modified(etag: str, private: bool = False) -> Response:
+    """
+    Ответ 304 без тела.
+    """
+    return Response(status_code=304, headers=etag_headers(etag, private))
+
+
+def with_etag(content: Any, response: Response, etag: str, private: bool = False) -> Any:
+    """
+    Добавляет ETag к ответу эндпоинта.
+
+    Если эндпоинт возвращает готовый Response, заголовки ставятся на него,
+    иначе - на Response, внедренный FastAPI.
+    """
+    target = content if isinstance(content, Response) else response
+    target.headers.update(etag_headers(etag, private))
+    return content
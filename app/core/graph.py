@@ -0,0 +1,225 @@
+from db.database import async_session_maker
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from array import array
+from .config import settings
+from db import Follow
+import asyncio
+import bisect
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+EMPTY = array("q")
+
+
+def _add(index: Dict[int, array], key: int, value: int) -> bool:
+    values = index.get(key)
+    if values is None:
+        index[key] = array("q", [value])
+        return True
+    position = bisect.bisect_left(values, value)
+    if position < len(values) and values[position] == value:
+        return False
+    values.insert(position, value)
+    return True
+
+
+def _remove(index: Dict[int, array], key: int, value: int) -> bool:
+    values = index.get(key)
+    if not values:
+        return False
+    position = bisect.bisect_left(values, value)
+    if position == len(values) or values[position] != value:
+        return False
+    del values[position]
+    if not values:
+        del index[key]
+    return True
+
+
+def _contains(values: array, value: int) -> bool:
+    position = bisect.bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти процесса.
+
+    Для каждого пользователя хранятся отсортированные массивы `array('q')`
+    ID подписок и подписчиков: 8 байт на связь в каждом направлении и поиск
+    бинарным поиском без обращения к БД. Граф загружается при старте,
+    обновляется в follow/unfollow и периодически перечитывается из `follows`,
+    чтобы подхватить изменения, сделанные другими воркерами.
+
+    Изменения, сделанные этим воркером во время загрузки, записываются и
+    применяются к новому графу после build, поэтому перезагрузка их не теряет.
+    Изменения других воркеров видны только после следующей перезагрузки: граф
+    отстает от БД не больше чем на GRAPH_REFRESH_SECONDS плюс время загрузки.
+    Поэтому граф используется только для чтения (/mutuals, fan-out) и никогда
+    не решает исход записи.
+    """
+
+    def __init__(self) -> None:
+        self.following: Dict[int, array] = {}
+        self.followers: Dict[int, array] = {}
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._pending: Optional[List[Tuple[bool, int, int]]] = None
+
+    def begin_load(self) -> None:
+        """
+        Начинает запись изменений для повтора после build; вызывается до чтения `follows`.
+        """
+        self._pending = []
+
+    def cancel_load(self) -> None:
+        """
+        Прекращает запись изменений, если загрузка не удалась.
+        """
+        self._pending = None
+
+    def build(self, edges: Iterable[tuple]) -> None:
+        """
+        Строит граф из пар (follower_id, following_id) и атомарно заменяет текущий.
+
+        Args:
+            edges: Пары, отсортированные по follower_id, following_id
+        """
+        following: Dict[int, array] = {}
+        followers: Dict[int, array] = {}
+        for follower_id, following_id in edges:
+            following.setdefault(follower_id, array("q")).append(following_id)
+            followers.setdefault(following_id, array("q")).append(follower_id)
+        for key, values in followers.items():
+            followers[key] = array("q", sorted(values))
+
+        self.following, self.followers = following, followers
+        pending, self._pending = self._pending or [], None
+        for added, follower_id, following_id in pending:
+            self._apply(added, follower_id, following_id)
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    def _apply(self, added: bool, follower_id: int, following_id: int) -> None:
+        if added:
+            _add(self.following, follower_id, following_id)
+            _add(self.followers, following_id, follower_id)
+        else:
+            _remove(self.following, follower_id, following_id)
+            _remove(self.followers, following_id, follower_id)
+
+    def add(self, follower_id: int, following_id: int) -> None:
+        """
+        Добавляет связь; повторное добавление ничего не меняет.
+        """
+        self._apply(True, follower_id, following_id)
+        if self._pending is not None:
+            self._pending.append((True, follower_id, following_id))
+
+    def remove(self, follower_id: int, following_id: int) -> None:
+        """
+        Удаляет связь, если она есть.
+        """
+        self._apply(False, follower_id, following_id)
+        if self._pending is not None:
+            self._pending.append((False, follower_id, following_id))
+
+    def is_following(self, follower_id: int, following_id: int) -> bool:
+        """
+        Проверяет, подписан ли follower_id на following_id.
+        """
+        return _contains(self.following.get(follower_id, EMPTY), following_id)
+
+    def following_of(self, user_id: int) -> array:
+        """
+        Возвращает отсортированный массив ID подписок пользователя.
+        """
+        return self.following.get(user_id, EMPTY)
+
+    def followers_of(self, user_id: int) -> array:
+        """
+        Возвращает отсортированный массив ID подписчиков (список для fan-out).
+        """
+        return self.followers.get(user_id, EMPTY)
+
+    def mutuals(self, user_id: int, other_id: Optional[int] = None) -> List[int]:
+        """
+        Пересечение отсортированных массивов.
+
+        Args:
+            user_id: ID пользователя
+            other_id: Если задан - общие подписки двух пользователей,
+                      иначе - взаимные подписки user_id (он подписан и на него подписаны)
+
+        Returns:
+            List[int]: Отсортированные ID
+        """
+        if other_id is None:
+            left, right = self.following_of(user_id), self.followers_of(user_id)
+        else:
+            left, right = self.following_of(user_id), self.following_of(other_id)
+        if len(left) > len(right):
+            left, right = right, left
+        return [value for value in left if _contains(right, value)]
+
+    def stats(self) -> dict:
+        """
+        Возвращает размер графа и занимаемую массивами память.
+        """
+        arrays = list(self.following.values()) + list(self.followers.values())
+        return {
+            "loaded": self.loaded,
+            "users": len(self.following.keys() | self.followers.keys()),
+            "edges": sum(len(values) for values in self.following.values()),
+            "bytes": sum(values.buffer_info()[1] * values.itemsize for values in arrays),
+            "age_seconds": time.monotonic() - self.loaded_at if self.loaded else None,
+        }
+
+
+follow_graph = FollowGraph()
+
+
+async def load_follow_graph() -> None:
+    """
+    Читает таблицу `follows` потоком и перестраивает граф.
+
+    follow/unfollow этого воркера, завершившиеся во время чтения, повторяются
+    поверх загруженного снимка (см. FollowGraph.begin_load).
+    """
+    started_at = time.perf_counter()
+    follow_graph.begin_load()
+    try:
+        async with async_session_maker() as session:
+            result = await session.stream(
+                select(Follow.follower_id, Follow.following_id)
+                .order_by(Follow.follower_id, Follow.following_id)
+                .execution_options(yield_per=10000)
+            )
+            follower_ids, following_ids = array("q"), array("q")
+            async for follower_id, following_id in result:
+                follower_ids.append(follower_id)
+                following_ids.append(following_id)
+    except Exception:
+        follow_graph.cancel_load()
+        raise
+    follow_graph.build(zip(follower_ids, following_ids))
+    logger.info(
+        "Follow graph loaded: %s edges in %.0f ms",
+        len(follower_ids), (time.perf_counter() - started_at) * 1000
+    )
+
+
+async def refresh_follow_graph() -> None:
+    """
+    Фоновая задача: периодически перечитывает граф (GRAPH_REFRESH_SECONDS).
+    """
+    while True:
+        await asyncio.sleep(settings.GRAPH_REFRESH_SECONDS)
+        try:
+            await load_follow_graph()
+        except Exception:
+            logger.exception("Failed to refresh follow graph")
@@ -0,0 +1,145 @@
+from concurrent.futures import ProcessPoolExecutor
+from db.database import async_session_maker
+from typing import Dict, List, Optional
+from PIL import Image
+from sqlalchemy import select, update
+from .config import settings
+from db.models import tweets_medias
+from db import Media, Tweet
+import asyncio
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    "thumbnail": settings.MEDIA_THUMBNAIL_SIZE,
+    "medium": settings.MEDIA_MEDIUM_SIZE,
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def render_variants(directory: str, file_path: str, sizes: Dict[str, int], webp: bool) -> Dict[str, str]:
+    """
+    Создает уменьшенные копии изображения. Выполняется в дочернем процессе.
+
+    Копии получают имена вида `<имя>_<вариант><расширение>` рядом с оригиналом;
+    уже существующие файлы повторно не пересчитываются.
+
+    Args:
+        directory: Каталог медиа
+        file_path: Путь оригинала внутри каталога
+        sizes: Максимальная сторона для каждого варианта
+        webp: Сохранять варианты в WebP
+
+    Returns:
+        Dict[str, str]: Пути вариантов внутри каталога по именам вариантов
+    """
+    stem, extension = os.path.splitext(file_path)
+    if webp:
+        extension, image_format = ".webp", "WEBP"
+    elif extension == ".jpg":
+        image_format = "JPEG"
+    else:
+        extension, image_format = ".png", "PNG"
+
+    paths = {}
+    with Image.open(os.path.join(directory, file_path)) as image:
+        for name, max_side in sizes.items():
+            variant_path = f"{stem}_{name}{extension}"
+            target = os.path.join(directory, variant_path)
+            if not os.path.exists(target):
+                variant = image.copy()
+                variant.thumbnail((max_side, max_side))
+                if image_format == "JPEG" and variant.mode != "RGB":
+                    variant = variant.convert("RGB")
+                elif variant.mode == "P":
+                    variant = variant.convert("RGBA")
+                temp_target = f"{target}.{os.getpid()}.tmp"
+                variant.save(temp_target, format=image_format, quality=85)
+                os.replace(temp_target, target)
+            paths[name] = variant_path
+    return paths
+
+
+def variant_paths(file_path: str) -> List[str]:
+    """
+    Возможные пути вариантов оригинала, в том числе построенных при другой настройке WebP.
+
+    Args:
+        file_path: Путь оригинала внутри каталога медиа
+
+    Returns:
+        List[str]: Пути вариантов внутри каталога
+    """
+    stem, extension = os.path.splitext(file_path)
+    extensions = (".jpg" if extension == ".jpg" else ".png", ".webp")
+    return [f"{stem}_{name}{variant_extension}" for name in VARIANT_SIZES for variant_extension in extensions]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.MEDIA_VARIANT_WORKERS)
+    return _executor
+
+
+async def generate_variants(media_id: int, file_path: str) -> None:
+    """
+    Фоновая задача: строит варианты изображения в пуле процессов и сохраняет пути в `medias`.
+
+    Если генерация выключена или очередь переполнена, задача ничего не делает,
+    и клиенты получают оригинал.
+
+    Args:
+        media_id: ID строки `medias`
+        file_path: Путь оригинала внутри каталога медиа
+    """
+    global _pending
+    if not settings.MEDIA_VARIANTS_ENABLED:
+        return
+    if _pending >= settings.MEDIA_VARIANT_QUEUE:
+        logger.warning("Variant queue is full, skipping media %s", media_id)
+        return
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        paths = await loop.run_in_executor(
+            _get_executor(),
+            render_variants,
+            settings.MEDIA_DIR,
+            file_path,
+            VARIANT_SIZES,
+            settings.MEDIA_VARIANT_WEBP,
+        )
+        async with async_session_maker() as session:
+            await session.execute(
+                update(Media)
+                .where(Media.id == media_id)
+                .values(thumbnail_path=paths["thumbnail"], medium_path=paths["medium"])
+            )
+            # URL вложений в ленте меняются: сбрасываем ETag лент с этими твитами
+            await session.execute(
+                update(Tweet)
+                .where(Tweet.id.in_(select(tweets_medias.c.tweet_id).where(tweets_medias.c.media_id == media_id)))
+                .values(version=Tweet.version + 1)
+            )
+            await session.commit()
+    except Exception:
+        logger.exception("Failed to generate variants for media %s", media_id)
+    finally:
+        _pending -= 1
+
+
+def shutdown_variant_pool() -> None:
+    """
+    Останавливает пул процессов при завершении приложения.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,79 @@
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+from starlette.responses import FileResponse, Response
+from starlette.datastructures import Headers
+from .config import settings
+import re
+import os
+
+
+IMMUTABLE_NAME = re.compile(
+    r"^(?:[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?:_[a-z]+)?\.[a-z0-9]+$"
+)
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse, отдающий файл через расширение ASGI `http.response.pathsend`,
+    если сервер его поддерживает: тогда копирование выполняет сервер (sendfile),
+    а не Python-воркер.
+
+    Через pathsend отдается только полный файл на GET; HEAD и Range-запросы
+    обрабатывает FileResponse. Заголовки длины и даты берутся из stat_result,
+    поэтому он обязателен.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            "http.response.pathsend" not in scope.get("extensions", {})
+            or scope["method"].upper() == "HEAD"
+            or "range" in Headers(scope=scope)
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        if self.background is not None:
+            await self.background()
+
+
+class MediaFiles(StaticFiles):
+    """
+    Раздача загруженных медиафайлов.
+
+    Файлы с именем из хэша или UUID никогда не меняются, поэтому получают
+    `Cache-Control: immutable` и сильный ETag по имени файла. Поддерживаются
+    304 по If-None-Match, Range-запросы и передача отдачи фронт-прокси через
+    X-Accel-Redirect (если задан MEDIA_ACCEL_REDIRECT_PREFIX).
+    """
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        file_name = os.path.basename(full_path)
+
+        headers = {}
+        if IMMUTABLE_NAME.match(file_name):
+            headers["cache-control"] = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+            headers["etag"] = f'"{file_name}"'
+        else:
+            headers["cache-control"] = "no-cache"
+
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            headers["x-accel-redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative_path
+            response = Response(status_code=status_code, headers=headers)
+            if "etag" in headers and self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = MediaFileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,172 @@
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, func, select
+from db.database import async_session_maker
+from datetime import datetime, timedelta, timezone
+from db import Media, release_blob
+from db.models import tweets_medias
+from typing import List, Optional
+from .images import variant_paths
+from .config import settings
+from . import metrics
+import asyncio
+import logging
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_try_advisory_xact_lock: пакет обрабатывает только один воркер
+MEDIA_GC_LOCK_ID = 0x6D656469
+
+
+def _unlink_files(directory: str, paths: List[str]) -> int:
+    freed = 0
+    for path in paths:
+        full_path = os.path.join(directory, path)
+        try:
+            size = os.stat(full_path).st_size
+            os.remove(full_path)
+        except FileNotFoundError:
+            continue
+        freed += size
+    return freed
+
+
+class MediaSweeper:
+    """
+    Сборщик медиа, не прикрепленных ни к одному твиту.
+
+    Строка `medias` появляется при загрузке, до создания твита, поэтому брошенные
+    загрузки и медиа удаленных твитов остаются навсегда. Сборщик раз в
+    MEDIA_GC_INTERVAL_SECONDS проходит `medias` по возрастанию ID и пакетами по
+    MEDIA_GC_BATCH_SIZE удаляет строки без связей в `tweets_medias`, созданные
+    раньше MEDIA_GC_GRACE_HOURS назад. Для каждой строки снимается ссылка на
+    файл хранилища; файл и его варианты удаляются, когда ссылок не остается.
+
+    Скорость ограничена MEDIA_GC_FILES_PER_SECOND: после пакета сборщик ждет
+    пропорционально числу удаленных файлов, а транзакции остаются короткими.
+    """
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.deleted = 0
+        self.files = 0
+        self.reclaimed_bytes = 0
+        self.last_run_at: Optional[float] = None
+
+    async def sweep_batch(self, after_id: int, cutoff: datetime) -> Optional[List[int]]:
+        """
+        Удаляет один пакет брошенных медиа.
+
+        Args:
+            after_id: Пакет берется из строк с ID больше этого
+            cutoff: Строки, созданные позже, не трогаются
+
+        Returns:
+            Optional[List[int]]: ID удаленных строк или None, если пакет обрабатывает другой воркер
+        """
+        candidates = (
+            select(Media.id)
+            .where(
+                Media.id > after_id,
+                Media.created_at < cutoff,
+                ~exists().where(tweets_medias.c.media_id == Media.id)
+            )
+            .order_by(Media.id)
+            .limit(settings.MEDIA_GC_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with async_session_maker() as session:
+            if not await session.scalar(select(func.pg_try_advisory_xact_lock(MEDIA_GC_LOCK_ID))):
+                return None
+
+            result = await session.execute(
+                delete(Media)
+                .where(Media.id.in_(candidates))
+                .returning(Media.id, Media.digest, Media.file_path, Media.thumbnail_path, Media.medium_path)
+            )
+            rows = result.all()
+
+            paths = []
+            for _, digest, file_path, thumbnail_path, medium_path in sorted(rows, key=lambda row: row[1] or ""):
+                if digest is None:
+                    paths.extend(path for path in (file_path, thumbnail_path, medium_path) if path)
+                    continue
+                released_path = await release_blob(session, digest)
+                if released_path is not None:
+                    paths.append(released_path)
+                    paths.extend(variant_paths(released_path))
+
+            # Файлы удаляются до commit, пока строки media_blobs заблокированы: после
+            # коммита параллельная загрузка того же содержимого может заново создать
+            # блоб и опубликовать файл, и удаление стерло бы уже его (см. release_blob)
+            freed = await run_in_threadpool(_unlink_files, settings.MEDIA_DIR, paths)
+            try:
+                await session.commit()
+            except Exception:
+                # Строки откатились и снова будут найдены следующим проходом, но пока
+                # ссылаются на удаленные файлы
+                logger.error(
+                    "Media sweep commit failed after unlinking %d files, rows %s now point to missing files: %s",
+                    len(paths), [row[0] for row in rows], paths
+                )
+                raise
+
+        self.deleted += len(rows)
+        self.files += len(paths)
+        self.reclaimed_bytes += freed
+        metrics.media_gc_deleted.inc(len(rows))
+        metrics.media_gc_reclaimed_bytes.inc(freed)
+        if paths and settings.MEDIA_GC_FILES_PER_SECOND > 0:
+            await asyncio.sleep(len(paths) / settings.MEDIA_GC_FILES_PER_SECOND)
+        return sorted(row[0] for row in rows)
+
+    async def sweep(self) -> int:
+        """
+        Один полный проход по таблице `medias`.
+
+        Returns:
+            int: Число удаленных строк
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.MEDIA_GC_GRACE_HOURS)
+        deleted_before, after_id = self.deleted, 0
+        while True:
+            deleted_ids = await self.sweep_batch(after_id, cutoff)
+            if not deleted_ids:
+                break
+            after_id = deleted_ids[-1]
+            if len(deleted_ids) < settings.MEDIA_GC_BATCH_SIZE:
+                break
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        deleted = self.deleted - deleted_before
+        if deleted:
+            logger.info("Media sweeper deleted %s orphaned media, %s bytes reclaimed in total", deleted, self.reclaimed_bytes)
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.MEDIA_GC_ENABLED,
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "files": self.files,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run_age_seconds": time.time() - self.last_run_at if self.last_run_at else None,
+        }
+
+
+media_sweeper = MediaSweeper()
+
+
+async def sweep_orphaned_media() -> None:
+    """
+    Фоновая задача: периодически запускает сборщик медиа (MEDIA_GC_INTERVAL_SECONDS).
+    """
+    while True:
+        await asyncio.sleep(settings.MEDIA_GC_INTERVAL_SECONDS)
+        try:
+            await media_sweeper.sweep()
+        except Exception:
+            logger.exception("Media sweep failed")
@@ -0,0 +1,368 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Callable, Dict, List, Optional, Tuple
+from .config import settings
+import asyncio
+import logging
+import bisect
+import json
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 2.5e6, 5e6, 10e6)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+class Value:
+    """
+    Значение счетчика или gauge для одного набора меток.
+
+    Обновляется без блокировок: все изменения выполняются в потоке event loop.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def state(self) -> float:
+        return self.value
+
+
+class Histogram:
+    """
+    Гистограмма для одного набора меток: счетчики по корзинам и сумма наблюдений.
+    """
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def state(self) -> list:
+        return self.counts + [self.sum]
+
+
+class Family:
+    """
+    Метрика с именем и набором меток. Дочерние значения создаются один раз
+    на набор меток и затем переиспользуются вызывающим кодом.
+    """
+
+    def __init__(self, name: str, kind: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self.children.get(values)
+        if child is None:
+            child = Histogram(self.buckets) if self.kind == "histogram" else Value()
+            self.children[values] = child
+        return child
+
+
+class Registry:
+    """
+    Набор метрик процесса и функций, обновляющих значения перед снимком.
+    """
+
+    def __init__(self) -> None:
+        self.families: Dict[str, Family] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def family(self, name: str, kind: str, documentation: str, labelnames: Tuple[str, ...] = (),
+               buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Family:
+        family = Family(name, kind, documentation, labelnames, buckets)
+        self.families[name] = family
+        return family
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает состояние всех метрик в виде, пригодном для JSON и сложения.
+        """
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return {
+            name: {
+                "kind": family.kind,
+                "help": family.documentation,
+                "labels": list(family.labelnames),
+                "buckets": list(family.buckets) if family.kind == "histogram" else None,
+                "samples": [[list(values), child.state()] for values, child in family.children.items()],
+            }
+            for name, family in self.families.items()
+        }
+
+
+registry = Registry()
+
+request_duration = registry.family(
+    "http_request_duration_seconds", "histogram", "HTTP request latency", ("router", "route", "method")
+)
+requests_total = registry.family(
+    "http_requests_total", "counter", "HTTP requests by status class", ("router", "route", "method", "status")
+)
+requests_in_flight = registry.family(
+    "http_requests_in_flight", "gauge", "HTTP requests being processed"
+).labels()
+db_queries_total = registry.family(
+    "db_queries_total", "counter", "SQL statements executed by route", ("router", "route", "method")
+)
+db_query_seconds_total = registry.family(
+    "db_query_seconds_total", "counter", "Time spent in SQL statements by route", ("router", "route", "method")
+)
+upload_bytes = registry.family(
+    "media_upload_bytes", "histogram", "Size of stored media uploads", buckets=SIZE_BUCKETS
+).labels()
+upload_duration = registry.family(
+    "media_upload_duration_seconds", "histogram", "Media upload handling latency"
+).labels()
+media_gc_deleted = registry.family(
+    "media_gc_deleted_total", "counter", "Orphaned media rows deleted by the sweeper"
+).labels()
+media_gc_reclaimed_bytes = registry.family(
+    "media_gc_reclaimed_bytes_total", "counter", "Disk space freed by the media sweeper"
+).labels()
+
+_pool_gauges = {
+    key: registry.family(f"db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}", ("engine",))
+    for key in ("size", "checked_out", "overflow", "max_overflow")
+}
+_pool_counters = {
+    key: registry.family(f"db_pool_{key}_total", "counter", f"Connection pool {key}", ("engine",))
+    for key in ("checkouts", "timeouts")
+}
+_pool_wait = registry.family(
+    "db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", ("engine",)
+)
+
+
+def _collect_pool() -> None:
+    from db import pool_stats_by_engine
+
+    for engine, stats in pool_stats_by_engine().items():
+        for key, family in _pool_gauges.items():
+            family.labels(engine).set(stats[key])
+        for key, family in _pool_counters.items():
+            family.labels(engine).set(stats[key])
+        _pool_wait.labels(engine).set(stats["wait_total_ms"] / 1000)
+
+
+registry.collectors.append(_collect_pool)
+
+
+class RouteMetrics:
+    """
+    Заранее привязанные к меткам маршрута значения, чтобы запрос не создавал объектов меток.
+    """
+    __slots__ = ("duration", "statuses", "queries", "query_seconds")
+
+    def __init__(self, router: str, route: str, method: str) -> None:
+        self.duration = request_duration.labels(router, route, method)
+        self.statuses = [requests_total.labels(router, route, method, status) for status in STATUS_CLASSES]
+        self.queries = db_queries_total.labels(router, route, method)
+        self.query_seconds = db_query_seconds_total.labels(router, route, method)
+
+    def observe(self, duration: float, status_code: int, query_stats) -> None:
+        self.duration.observe(duration)
+        self.statuses[min(max(status_code // 100, 1), 5) - 1].inc()
+        if query_stats is not None and query_stats.queries:
+            self.queries.inc(query_stats.queries)
+            self.query_seconds.inc(query_stats.duration)
+
+
+_routes: Dict[object, RouteMetrics] = {}
+
+
+def _route_metrics(scope: Scope) -> RouteMetrics:
+    route = scope.get("route")
+    if route is not None:
+        metrics = _routes.get(id(route))
+        if metrics is None:
+            router = route.tags[0] if getattr(route, "tags", None) else "app"
+            method = ",".join(sorted(getattr(route, "methods", None) or [scope["method"]]))
+            metrics = _routes[id(route)] = RouteMetrics(str(router), route.path, method)
+        return metrics
+
+    key = (scope.get("root_path") or "/", scope["method"])
+    metrics = _routes.get(key)
+    if metrics is None:
+        metrics = _routes[key] = RouteMetrics("static", key[0], key[1])
+    return metrics
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, собирающее задержки, статусы, запросы в работе и SQL-статистику по маршрутам.
+
+    Маршрут определяется по шаблону пути (`/api/tweets/{tweet_id}`), а роутер -
+    по тегу из include_router, поэтому число рядов не зависит от ID в URL.
+    SQL-статистика берется у QueryStatsMiddleware, которое должно стоять внутри.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.value += 1
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.value -= 1
+            _route_metrics(scope).observe(time.perf_counter() - started_at, status_code, scope.get("query_stats"))
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(settings.METRICS_DIR, f"{pid}.json")
+
+
+def write_snapshot() -> None:
+    """
+    Сохраняет снимок метрик процесса в METRICS_DIR для сбора с других воркеров.
+    """
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_snapshots() -> List[dict]:
+    snapshots = []
+    for file_name in os.listdir(settings.METRICS_DIR):
+        stem, extension = os.path.splitext(file_name)
+        if extension != ".json" or not stem.isdigit() or int(stem) == os.getpid():
+            continue
+        path = os.path.join(settings.METRICS_DIR, file_name)
+        if not _pid_alive(int(stem)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge(snapshots: List[dict]) -> dict:
+    """
+    Складывает снимки воркеров: счетчики, gauge и корзины гистограмм суммируются.
+    """
+    merged: dict = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.setdefault(name, {**family, "samples": {}})
+            for values, state in family["samples"]:
+                key = tuple(values)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = state
+                elif isinstance(state, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, state)]
+                else:
+                    target["samples"][key] = current + state
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: List[str], values: List[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged: dict) -> str:
+    """
+    Форматирует метрики в текстовом формате экспозиции Prometheus.
+    """
+    lines = []
+    for name, family in merged.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        labels = family["labels"]
+        for values, state in family["samples"].items():
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels, values)} {state}")
+                continue
+            counts, total = state[:-1], state[-1]
+            cumulative = 0
+            for bound, count in zip(family["buckets"] + ["+Inf"], counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, values, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels, values)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition() -> str:
+    """
+    Метрики этого процесса и, если задан METRICS_DIR, остальных живых воркеров.
+    """
+    snapshots = [registry.snapshot()]
+    if settings.METRICS_DIR:
+        snapshots.extend(_read_snapshots())
+    return render(merge(snapshots))
+
+
+async def flush_metrics() -> None:
+    """
+    Фоновая задача: периодически пишет снимок метрик воркера в METRICS_DIR.
+    """
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            write_snapshot()
+        except Exception:
+            logger.exception("Failed to write metrics snapshot")
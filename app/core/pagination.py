@@ -0,0 +1,65 @@
+from fastapi import HTTPException, status
+from typing import Any, List, Tuple
+import base64
+import math
+import json
+
+
+# Все целочисленные ключи сортировки - столбцы INTEGER
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _valid_value(value: Any, expected: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if expected is int:
+        return isinstance(value, int) and INT_MIN <= value <= INT_MAX
+    if expected is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, expected)
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Упаковывает ключ сортировки последней записи страницы в непрозрачный курсор.
+
+    Args:
+        values: Значения ключа сортировки (например, likes_count и id твита)
+
+    Returns:
+        str: URL-безопасная base64-строка
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> List[Any]:
+    """
+    Распаковывает курсор, полученный от клиента, и проверяет типы значений.
+
+    Args:
+        cursor: Строка курсора из параметров запроса
+        types: Ожидаемые типы значений ключа сортировки (int - в диапазоне INTEGER)
+
+    Returns:
+        List[Any]: Значения ключа сортировки
+
+    Raises:
+        HTTPException: 400 Bad Request - если курсор поврежден или не подходит к запросу
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(_valid_value(value, expected) for value, expected in zip(values, types))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
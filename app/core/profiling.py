@@ -0,0 +1,112 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from pyinstrument.renderers import SpeedscopeRenderer
+from pyinstrument import Profiler
+from .config import settings
+import logging
+import random
+import hmac
+import uuid
+import re
+import os
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+PROFILE_SUFFIX = ".speedscope.json"
+
+
+def profiling_enabled() -> bool:
+    """
+    Профилирование включено, если задан токен или доля выборки.
+    """
+    return bool(settings.PROFILE_TOKEN or settings.PROFILE_SAMPLE_RATE > 0)
+
+
+def _write_profile(path: str, content: str) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    _prune_profiles(directory, settings.PROFILE_MAX_FILES)
+
+
+def _prune_profiles(directory: str, max_files: int) -> None:
+    """
+    Оставляет в каталоге не больше max_files последних профилей.
+    """
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(PROFILE_SUFFIX):
+            try:
+                profiles.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    profiles.sort()
+    for _, path in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware, снимающее статистический профиль отдельных запросов.
+
+    Профилируется запрос с заголовком `X-Profile: <PROFILE_TOKEN>` либо случайная
+    доля PROFILE_SAMPLE_RATE всех запросов. pyinstrument в асинхронном режиме
+    учитывает только стек этого запроса, включая время ожидания в await (БД).
+    Профиль пишется в PROFILE_DIR/<request id>-<случайный суффикс>.speedscope.json,
+    чтобы повторный или подобранный X-Request-ID не перезаписал чужой профиль;
+    имя без расширения возвращается в заголовке X-Profile-Id, а файл
+    открывается на speedscope.app. В каталоге хранится не больше
+    PROFILE_MAX_FILES последних профилей.
+
+    Middleware подключается, только если профилирование включено, поэтому
+    в обычном режиме накладных расходов нет.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def _should_profile(self, headers: Headers) -> bool:
+        token = headers.get("x-profile")
+        if token and settings.PROFILE_TOKEN and hmac.compare_digest(token, settings.PROFILE_TOKEN):
+            return True
+        return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not self._should_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get("x-request-id", "")
+        if not REQUEST_ID.match(request_id):
+            request_id = "request"
+        profile_id = f"{request_id}-{uuid.uuid4().hex[:12]}"
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            path = os.path.join(settings.PROFILE_DIR, f"{profile_id}{PROFILE_SUFFIX}")
+            try:
+                await run_in_threadpool(_write_profile, path, profiler.output(SpeedscopeRenderer()))
+                logger.info("%s %s profiled: %s", scope["method"], scope["path"], path)
+            except Exception:
+                logger.exception("Failed to write profile %s", path)
@@ -0,0 +1,135 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.datastructures import MutableHeaders
+from contextvars import ContextVar
+from sqlalchemy.engine import Engine
+from typing import Optional, List, Tuple, Any
+from collections import Counter
+from sqlalchemy import event
+from .config import settings
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Статистика SQL-запросов, выполненных в рамках одного HTTP-запроса.
+    """
+    __slots__ = ("queries", "duration", "rows", "statements", "repeats")
+
+    def __init__(self, capture: bool = False) -> None:
+        self.queries = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.repeats: Counter = Counter()
+        self.statements: Optional[List[Tuple[str, Any]]] = [] if capture else None
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """
+        Возвращает самый часто повторявшийся запрос и число его повторов (признак N+1).
+        """
+        if not self.repeats:
+            return None, 0
+        return self.repeats.most_common(1)[0]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """
+    Возвращает статистику текущего запроса или None вне HTTP-запроса.
+    """
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        context._query_stats_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started_at = getattr(context, "_query_stats_started_at", None)
+    if stats is None or started_at is None:
+        return
+
+    stats.queries += 1
+    stats.duration += time.perf_counter() - started_at
+    stats.repeats[statement] += 1
+    # Для запросов с результатом (SELECT, RETURNING) asyncpg берет rowcount из
+    # статуса "SELECT n" уже полученного результата, то есть это число возвращенных
+    # строк. Потоковые курсоры (session.stream) отдают -1 и не учитываются.
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if stats.statements is not None:
+        stats.statements.append((statement, parameters))
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware, считающее SQL-запросы, время в БД и прочитанные строки на запрос.
+
+    Результат отдается в заголовках X-DB-Queries, X-DB-Time-Ms и X-DB-Rows.
+    X-DB-Rows - строки, возвращенные запросами с результатом (SELECT, RETURNING),
+    без строк потоковых курсоров; строки, измененные UPDATE/DELETE без RETURNING,
+    не учитываются.
+    Если запрос превысил QUERY_BUDGET или один и тот же SQL повторился
+    N_PLUS_ONE_THRESHOLD раз, в лог пишется предупреждение.
+    """
+
+    def __init__(self, app: ASGIApp, budget: int = settings.QUERY_BUDGET) -> None:
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        scope["query_stats"] = stats
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.queries)
+                headers["X-DB-Time-Ms"] = f"{stats.duration_ms:.2f}"
+                headers["X-DB-Rows"] = str(stats.rows)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope: Scope, stats: QueryStats) -> None:
+        if not stats.queries:
+            return
+
+        method, path = scope["method"], scope["path"]
+        logger.info(
+            "%s %s queries=%d db_time=%.2fms rows=%d",
+            method, path, stats.queries, stats.duration_ms, stats.rows
+        )
+        if self.budget and stats.queries > self.budget:
+            logger.warning(
+                "%s %s exceeded query budget: %d > %d",
+                method, path, stats.queries, self.budget
+            )
+        statement, repeats = stats.most_repeated()
+        if repeats >= settings.N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                "%s %s possible N+1: statement repeated %d times: %s",
+                method, path, repeats, statement
+            )
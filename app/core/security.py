@@ -1,33 +1,55 @@
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import CurrentUser
 from sqlalchemy import select
 from db import get_db, User
+from .config import settings
+from .cache import TTLCache
+
+
+# Единственная инвалидация - истечение AUTH_CACHE_TTL: API-ключи и имена
+# пользователей приложение не меняет, а пользователей не удаляет
+auth_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
 
 
 async def get_current_user(
     api_key: str = Header(...),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> CurrentUser:
     """
     Получает текущего пользователя по API-ключу из заголовков.
 
+    Результат кэшируется в `auth_cache` (LRU + TTL), поэтому при попадании
+    запрос к БД не выполняется. При промахе читаются только id и имя, без
+    загрузки связей пользователя. Запись живет AUTH_CACHE_TTL секунд: ключ,
+    отозванный или измененный напрямую в БД, действует до ее истечения.
+
     Args:
         api_key: Ключ API, передаваемый в заголовке запроса
         db: Асинхронная сессия базы данных
 
     Returns:
-        User: Объект аутентифицированного пользователя
+        CurrentUser: Идентификатор и имя аутентифицированного пользователя
 
     Raises:
         HTTPException: 401 Unauthorized - если:
             - API-ключ не передан
             - Пользователь с таким ключом не найден
     """
-    result = await db.execute(select(User).where(User.api_key == api_key))
-    user = result.scalars().first()
-    if not user:
+    user = auth_cache.get(api_key)
+    if user is not None:
+        return user
+
+    result = await db.execute(
+        select(User.id, User.name).where(User.api_key == api_key)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
+
+    user = CurrentUser(id=row.id, name=row.name)
+    auth_cache.set(api_key, user)
     return user
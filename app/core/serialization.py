@@ -0,0 +1,100 @@
+from starlette.responses import JSONResponse, Response
+from typing import Any, List, Optional
+from .config import settings
+from .cache import TTLCache
+import orjson
+
+
+tweet_fragments = TTLCache(
+    maxsize=settings.TWEET_FRAGMENT_CACHE_SIZE,
+    ttl=settings.TWEET_FRAGMENT_CACHE_TTL
+)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Сериализует данные в JSON через orjson.
+    """
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse, сериализующий через orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """
+    Ответ с уже сериализованным JSON.
+    """
+    media_type = "application/json"
+
+
+def profile_payload(user: Any) -> dict:
+    """
+    Собирает профиль пользователя напрямую из ORM-объекта, без валидации через UserProfile.
+
+    Args:
+        user: ORM-объект User с загруженными followers и following
+
+    Returns:
+        dict: Данные в формате UserProfile
+    """
+    return {
+        "id": user.id,
+        "name": user.name,
+        "followers_count": user.followers_count,
+        "following_count": user.following_count,
+        "tweets_count": user.tweets_count,
+        "followers": [{"id": follower.id, "name": follower.name} for follower in user.followers],
+        "following": [{"id": followee.id, "name": followee.name} for followee in user.following],
+    }
+
+
+def encode_tweet(tweet: Any, author_name: str, attachments: List[str]) -> bytes:
+    """
+    Сериализует твит для ленты с кэшированием готовых байт.
+
+    Текст и автор твита неизменны, поэтому фрагмент перекодируется только когда
+    меняется набор лайкнувших или список вложений (например, готовы превью).
+
+    Args:
+        tweet: ORM-объект Tweet с загруженными liked_by
+        author_name: Имя автора
+        attachments: URL вложений
+
+    Returns:
+        bytes: JSON-объект твита
+    """
+    # selectinload не гарантирует порядок liked_by: без сортировки один и тот же
+    # набор лайков давал бы разные ключи и промахи кэша
+    liked_by = sorted(tweet.liked_by, key=lambda user: user.id)
+    key = (tweet.id, tuple([user.id for user in liked_by]), tuple(attachments))
+    fragment = tweet_fragments.get(key)
+    if fragment is None:
+        fragment = dumps({
+            "id": tweet.id,
+            "content": tweet.content,
+            "author": {"id": tweet.user_id, "name": author_name},
+            "likes": [{"user_id": user.id, "name": user.name} for user in liked_by],
+            "attachments": attachments,
+        })
+        tweet_fragments.set(key, fragment)
+    return fragment
+
+
+def encode_feed(tweets: List[bytes], next_cursor: Optional[str]) -> bytes:
+    """
+    Собирает ответ ленты из сериализованных твитов без повторного кодирования.
+    """
+    return (
+        b'{"result":true,"tweets":['
+        + b",".join(tweets)
+        + b'],"next_cursor":'
+        + dumps(next_cursor)
+        + b"}"
+    )
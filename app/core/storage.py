@@ -0,0 +1,222 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from starlette.datastructures import Headers
+from typing import NamedTuple, Optional
+from .config import settings
+import hashlib
+import uuid
+import os
+
+
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+
+EXTENSION_ALIASES = {".jpeg": ".jpg"}
+
+
+class StoredFile(NamedTuple):
+    """
+    Загруженный файл во временном каталоге, еще не опубликованный в хранилище.
+    """
+    digest: str
+    size: int
+    extension: str
+    temp_path: str
+
+    @property
+    def file_path(self) -> str:
+        """
+        Путь внутри каталога медиа: файлы раскладываются по первым двум символам хэша.
+        """
+        return f"{self.digest[:2]}/{self.digest}{self.extension}"
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """
+    Определяет тип изображения по сигнатуре (magic bytes) в начале файла.
+
+    Args:
+        head: Первые байты файла
+
+    Returns:
+        Optional[str]: Каноническое расширение (.png, .jpg, .gif) или None
+    """
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _publish(temp_path: str, final_path: str) -> None:
+    if os.path.exists(final_path):
+        _remove_quietly(temp_path)
+        return
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(temp_path, final_path)
+
+
+async def save_upload(upload: UploadFile, declared_ext: str) -> StoredFile:
+    """
+    Потоково сохраняет загруженный файл во временный каталог, не блокируя event loop.
+
+    Файл читается блоками MEDIA_CHUNK_SIZE, запись выполняется в пуле потоков,
+    а SHA-256 считается по ходу чтения. Тип проверяется по сигнатуре первого блока,
+    а размер самого файла - по MEDIA_MAX_SIZE.
+
+    К этому моменту Starlette уже разобрала форму и сохранила файл во временный
+    SpooledTemporaryFile, поэтому здесь отказ экономит только копирование в
+    хранилище. Объем, принимаемый до разбора формы, ограничивает UploadLimitMiddleware.
+
+    Args:
+        upload: Загружаемый файл
+        declared_ext: Расширение из имени файла (в нижнем регистре)
+
+    Returns:
+        StoredFile: Хэш, размер и временный путь файла
+
+    Raises:
+        HTTPException: 400 - если содержимое не совпадает с типом или превышен размер
+        HTTPException: 500 - если файл не удалось записать
+    """
+    if upload.size is not None and upload.size > settings.MEDIA_MAX_SIZE:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "File too large")
+
+    head = await upload.read(settings.MEDIA_CHUNK_SIZE)
+    detected_ext = detect_image_type(head)
+    if detected_ext is None or detected_ext != EXTENSION_ALIASES.get(declared_ext, declared_ext):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Unsupported file type")
+
+    await run_in_threadpool(os.makedirs, settings.MEDIA_TMP_DIR, exist_ok=True)
+    temp_path = os.path.join(settings.MEDIA_TMP_DIR, uuid.uuid4().hex)
+
+    hasher = hashlib.sha256()
+    size = 0
+    chunk = head
+    try:
+        buffer = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while chunk:
+                size += len(chunk)
+                if size > settings.MEDIA_MAX_SIZE:
+                    raise HTTPException(status.HTTP_400_BAD_REQUEST, "File too large")
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+                chunk = await upload.read(settings.MEDIA_CHUNK_SIZE)
+        finally:
+            await run_in_threadpool(buffer.close)
+    except HTTPException:
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+    except OSError as e:
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to save file: {str(e)}")
+
+    return StoredFile(hasher.hexdigest(), size, detected_ext, temp_path)
+
+
+async def publish_upload(stored: StoredFile, directory: str) -> None:
+    """
+    Переносит файл из временного каталога в хранилище под его хэшем.
+
+    Если файл с таким содержимым уже опубликован, временная копия просто удаляется.
+
+    Args:
+        stored: Результат save_upload
+        directory: Каталог медиа
+    """
+    final_path = os.path.join(directory, stored.file_path)
+    await run_in_threadpool(_publish, stored.temp_path, final_path)
+
+
+async def discard_upload(stored: StoredFile) -> None:
+    """
+    Удаляет временный файл загрузки, которая не была сохранена в БД.
+    """
+    await run_in_threadpool(_remove_quietly, stored.temp_path)
+
+
+async def remove_media_file(directory: str, file_path: str) -> None:
+    """
+    Удаляет файл хранилища, на который больше не ссылается ни одна строка `medias`.
+    """
+    await run_in_threadpool(_remove_quietly, os.path.join(directory, file_path))
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI-middleware, ограничивающее тело запроса загрузки до разбора формы.
+
+    Запрос с Content-Length больше MEDIA_MAX_SIZE + MEDIA_FORM_OVERHEAD (запас на
+    заголовки multipart) отклоняется с 413 без чтения тела. Для запросов без
+    Content-Length (chunked) тело считается по мере чтения: при превышении
+    лимита middleware само отправляет 413, а приложение вместо следующих
+    частей тела получает http.disconnect и прекращает разбор формы. Ответ
+    приложения после этого не отправляется, так что на диск попадает не
+    больше лимита.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str) -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.MEDIA_MAX_SIZE + settings.MEDIA_FORM_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    if not response_started:
+                        await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # Ответ 413 уже отправлен, ошибка разбора оборванного тела не важна
+            if not rejected:
+                raise
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse({"detail": "Request body too large"}, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        await response(scope, receive, send)
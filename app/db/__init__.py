@@ -1,12 +1,27 @@
 """
 Модуль `db` включает:
 - database.py: создание подключения к БД и сессий
+- pool.py: пул соединений с учетом ожидания и overflow
+- replicas.py: маршрутизация чтения на реплики
 - models.py: ORM-модели SQLAlchemy
+- timeline.py: поддержка материализованной домашней ленты
+- blobs.py: учет ссылок на файлы контентно-адресуемого хранилища медиа
+- ranking.py: рейтинг твитов для ранжированной ленты
+- like_buffer.py: отложенная пакетная запись лайков
 """
 
 
-from .models import User, Tweet, Follow, Like, Media
-from .database import Base, get_db
+from .models import User, Tweet, Follow, Like, Media, MediaBlob, Timeline
+from .database import Base, get_db, pool_stats
+from .timeline import fan_out_tweet, backfill_timeline, remove_author_from_timeline, timeline_version
+from .blobs import acquire_blob, release_blob
+from .replicas import get_read_db, pool_stats_by_engine
+from .ranking import tweet_score
+from .like_buffer import like_buffer
 
 
-__all__ = ["User", "Tweet", "Follow", "Like", "Media", "Base", "get_db"]
+__all__ = [
+    "User", "Tweet", "Follow", "Like", "Media", "MediaBlob", "Timeline", "Base", "get_db", "pool_stats",
+    "fan_out_tweet", "backfill_timeline", "remove_author_from_timeline", "timeline_version",
+    "acquire_blob", "release_blob", "get_read_db", "pool_stats_by_engine", "tweet_score", "like_buffer",
+]
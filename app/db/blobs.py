@@ -0,0 +1,57 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, delete
+from .models import MediaBlob
+from typing import Optional
+
+
+async def acquire_blob(db: AsyncSession, digest: str, file_path: str, size: int) -> None:
+    """
+    Регистрирует ссылку на файл хранилища, создавая запись при первой загрузке.
+
+    Args:
+        db: Асинхронная сессия БД
+        digest: SHA-256 содержимого файла
+        file_path: Путь файла внутри каталога медиа
+        size: Размер файла в байтах
+    """
+    stmt = pg_insert(MediaBlob).values(digest=digest, file_path=file_path, size=size, ref_count=1)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MediaBlob.digest],
+            set_={"ref_count": MediaBlob.ref_count + 1}
+        )
+    )
+
+
+async def release_blob(db: AsyncSession, digest: str) -> Optional[str]:
+    """
+    Снимает ссылку на файл хранилища.
+
+    Строка блокируется до конца транзакции, поэтому файл, путь которого вернула
+    функция, нужно удалить до commit: параллельная загрузка того же содержимого
+    дождется коммита и заново опубликует файл.
+
+    Args:
+        db: Асинхронная сессия БД
+        digest: SHA-256 содержимого файла
+
+    Returns:
+        Optional[str]: Путь файла, если ссылок больше не осталось, иначе None
+    """
+    result = await db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.digest == digest)
+        .values(ref_count=MediaBlob.ref_count - 1)
+        .returning(MediaBlob.ref_count)
+    )
+    ref_count = result.scalar_one_or_none()
+    if ref_count is None or ref_count > 0:
+        return None
+
+    result = await db.execute(
+        delete(MediaBlob)
+        .where(MediaBlob.digest == digest, MediaBlob.ref_count <= 0)
+        .returning(MediaBlob.file_path)
+    )
+    return result.scalar_one_or_none()
@@ -1,16 +1,55 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from fastapi import Request
+from .pool import InstrumentedQueuePool
 from core import settings
 
 
-engine = create_async_engine(settings.ASYNC_DATABASE_URL)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+def engine_options() -> dict:
+    """
+    Параметры пула соединений и драйвера asyncpg из настроек.
+    """
+    server_settings = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    }
+
+
+class PrimarySession(Session):
+    """
+    Синхронная сессия основной БД приложения: на нее, а не на весь класс Session,
+    вешаются события после записи (см. replicas.py).
+    """
+
+
+engine = create_async_engine(settings.ASYNC_DATABASE_URL, **engine_options())
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, sync_session_class=PrimarySession)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncSession:
+async def get_db(request: Request) -> AsyncSession:
     async with async_session_maker() as session:
+        session.info["api_key"] = request.headers.get("api-key")
         yield session
+
+
+def pool_stats() -> dict:
+    """
+    Возвращает статистику пула соединений основного движка.
+    """
+    return engine.pool.stats()
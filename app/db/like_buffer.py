@@ -0,0 +1,226 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import Integer, column, delete, select, tuple_, update, values
+from .database import async_session_maker
+from typing import Dict, List, Optional, Tuple
+from .models import Like, Tweet
+from collections import Counter
+from .ranking import tweet_score
+from core import settings
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """
+    Отложенная запись лайков (write-behind).
+
+    Намерения "лайк"/"снять лайк" копятся в памяти по ключу (user_id, tweet_id),
+    поэтому повторные переключения одного пользователя схлопываются в последнее
+    состояние. Фоновая задача сбрасывает их раз в LIKE_FLUSH_INTERVAL секунд или
+    при накоплении LIKE_BATCH_SIZE ключей: одна транзакция, многострочные
+    INSERT ... ON CONFLICT DO NOTHING и DELETE, затем одно обновление счетчиков.
+
+    Очередь ограничена LIKE_MAX_PENDING ключами; при переполнении enqueue
+    возвращает False, и вызывающий код пишет лайк синхронно. Лайки, не
+    дошедшие до БД, видны клиентам с задержкой до одного интервала.
+
+    Если запись пакета не удалась (deadlock, переключение БД, таймаут пула),
+    намерения возвращаются в очередь, не затирая более новые по тем же ключам,
+    а следующая попытка откладывается с экспоненциальной задержкой до
+    LIKE_RETRY_MAX_BACKOFF. Намерение считается потерянным только после
+    LIKE_MAX_RETRIES неудачных попыток.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Dict[Tuple[int, int], bool] = {}
+        self.attempts: Dict[Tuple[int, int], int] = {}
+        self.consecutive_failures = 0
+        self.flushed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def enqueue(self, user_id: int, tweet_id: int, liked: bool) -> bool:
+        """
+        Ставит намерение в очередь.
+
+        Args:
+            user_id: ID пользователя
+            tweet_id: ID твита
+            liked: True - поставить лайк, False - снять
+
+        Returns:
+            bool: False, если очередь заполнена и намерение не принято
+        """
+        key = (user_id, tweet_id)
+        if key not in self.pending and len(self.pending) >= settings.LIKE_MAX_PENDING:
+            self.rejected += 1
+            return False
+        self.pending[key] = liked
+        if self.attempts:
+            self.attempts.pop(key, None)
+        if len(self.pending) >= settings.LIKE_BATCH_SIZE:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные намерения в БД.
+
+        Returns:
+            int: Число обработанных ключей
+        """
+        async with self._lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+
+            likes = sorted(key for key, liked in batch.items() if liked)
+            unlikes = sorted(key for key, liked in batch.items() if not liked)
+            try:
+                async with async_session_maker() as session:
+                    deltas = Counter()
+                    for chunk in _chunks(likes):
+                        deltas.update(await _insert_likes(session, chunk))
+                    for chunk in _chunks(unlikes):
+                        deltas.subtract(await _delete_likes(session, chunk))
+                    await _apply_deltas(session, deltas)
+                    await session.commit()
+            except Exception:
+                logger.exception("Failed to flush %d buffered likes", len(batch))
+                self._requeue(batch)
+                return 0
+
+            for key in batch:
+                self.attempts.pop(key, None)
+            self.consecutive_failures = 0
+            self.flushed += len(batch)
+            self.batches += 1
+            return len(batch)
+
+    def _requeue(self, batch: Dict[Tuple[int, int], bool]) -> None:
+        self.consecutive_failures += 1
+        for key, liked in batch.items():
+            if key in self.pending:
+                # Пока шла запись, пришло более новое намерение - оно и будет записано
+                self.attempts.pop(key, None)
+                continue
+            attempts = self.attempts.get(key, 0) + 1
+            if attempts >= settings.LIKE_MAX_RETRIES:
+                self.attempts.pop(key, None)
+                self.failed += 1
+                continue
+            self.attempts[key] = attempts
+            self.pending[key] = liked
+
+    def backoff(self) -> float:
+        """
+        Пауза до следующей записи: интервал, удваиваемый после каждой неудачи подряд.
+        """
+        if not self.consecutive_failures:
+            return settings.LIKE_FLUSH_INTERVAL
+        return min(
+            settings.LIKE_FLUSH_INTERVAL * 2 ** self.consecutive_failures,
+            settings.LIKE_RETRY_MAX_BACKOFF
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self.consecutive_failures:
+                    await asyncio.sleep(self.backoff())
+                else:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.LIKE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """
+        Запускает фоновую запись.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую запись и сбрасывает остаток очереди (с повторами при ошибках).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _ in range(settings.LIKE_MAX_RETRIES):
+            if await self.flush() or not self.pending:
+                break
+            await asyncio.sleep(self.backoff())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.LIKE_WRITE_BEHIND,
+            "pending": len(self.pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "retrying": len(self.attempts),
+            "failed": self.failed,
+        }
+
+
+def _chunks(keys: List[Tuple[int, int]]):
+    # Ограничение числа bind-параметров asyncpg (32767) на запрос
+    for start in range(0, len(keys), 10000):
+        yield keys[start:start + 10000]
+
+
+async def _insert_likes(session, keys: List[Tuple[int, int]]) -> List[int]:
+    batch = values(column("user_id", Integer), column("tweet_id", Integer), name="batch").data(keys)
+    result = await session.execute(
+        pg_insert(Like)
+        .from_select(
+            ["user_id", "tweet_id"],
+            select(batch.c.user_id, batch.c.tweet_id)
+            .where(select(Tweet.id).where(Tweet.id == batch.c.tweet_id).exists())
+        )
+        .on_conflict_do_nothing()
+        .returning(Like.tweet_id)
+    )
+    return result.scalars().all()
+
+
+async def _delete_likes(session, keys: List[Tuple[int, int]]) -> List[int]:
+    result = await session.execute(
+        delete(Like)
+        .where(tuple_(Like.user_id, Like.tweet_id).in_(keys))
+        .returning(Like.tweet_id)
+    )
+    return result.scalars().all()
+
+
+async def _apply_deltas(session, deltas: Counter) -> None:
+    changes = sorted((tweet_id, delta) for tweet_id, delta in deltas.items() if delta)
+    if not changes:
+        return
+    batch = values(column("id", Integer), column("delta", Integer), name="deltas").data(changes)
+    await session.execute(
+        update(Tweet)
+        .where(Tweet.id == batch.c.id)
+        .values(
+            likes_count=Tweet.likes_count + batch.c.delta,
+            score=tweet_score(Tweet.likes_count + batch.c.delta, Tweet.created_at),
+            version=Tweet.version + 1
+        )
+    )
+
+
+like_buffer = LikeBuffer()
@@ -1,8 +1,9 @@
-from sqlalchemy import Integer, String, ForeignKey, Text, DateTime, Table, Column, func
+from sqlalchemy import Integer, BigInteger, Float, String, ForeignKey, Text, DateTime, Table, Column, Index, Computed, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from datetime import datetime
 from .database import Base
-from typing import List
+from typing import List, Optional
 
 
 tweets_medias = Table(
@@ -10,6 +11,7 @@ tweets_medias = Table(
     Base.metadata,
     Column("tweet_id", ForeignKey("tweets.id", ondelete="CASCADE"), primary_key=True),
     Column("media_id", ForeignKey("medias.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_tweets_medias_media_id", "media_id"),
 )
 
 
@@ -19,6 +21,10 @@ class User(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     api_key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    followers_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    following_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    tweets_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     tweets: Mapped[List["Tweet"]] = relationship(
         back_populates="author",
@@ -56,6 +62,19 @@ class Tweet(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    likes_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    score: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', content)", persisted=True),
+        deferred=True
+    )
+
+    __table_args__ = (
+        Index("ix_tweets_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tweets_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     author: Mapped["User"] = relationship(back_populates="tweets")
 
@@ -83,6 +102,10 @@ class Follow(Base):
         primary_key=True
     )
 
+    __table_args__ = (
+        Index("ix_follows_following_id_follower_id", "following_id", "follower_id"),
+    )
+
 
 class Like(Base):
     __tablename__ = "likes"
@@ -95,12 +118,53 @@ class Like(Base):
         primary_key=True
     )
 
+    __table_args__ = (
+        Index("ix_likes_tweet_id_user_id", "tweet_id", "user_id"),
+    )
+
+
+class Timeline(Base):
+    """
+    Материализованная домашняя лента: ID твитов авторов, на которых подписан пользователь.
+
+    Заполняется при записи (fan-out) и упорядочена по первичному ключу,
+    поэтому чтение ленты сводится к срезу по индексу (user_id, tweet_id).
+    """
+    __tablename__ = "timelines"
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        ForeignKey("tweets.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+
+
+class MediaBlob(Base):
+    """
+    Файл в контентно-адресуемом хранилище: один на каждый уникальный SHA-256.
+
+    ref_count - число строк `medias`, ссылающихся на файл; при обнулении файл удаляется.
+    """
+    __tablename__ = "media_blobs"
+
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
 
 class Media(Base):
     __tablename__ = "medias"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     file_path: Mapped[str] = mapped_column(String, nullable=False)
+    digest: Mapped[Optional[str]] = mapped_column(ForeignKey("media_blobs.digest"), nullable=True, index=True)
+    thumbnail_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    medium_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     tweets: Mapped[List["Tweet"]] = relationship(
         secondary=tweets_medias,
@@ -0,0 +1,49 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError
+import time
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, считающий время ожидания соединения, таймауты и пик overflow.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits_total = 0.0
+        self.waits_max = 0.0
+        self.timeouts = 0
+        self.peak_overflow = 0
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            self.checkouts += 1
+            self.waits_total += waited
+            self.waits_max = max(self.waits_max, waited)
+            self.peak_overflow = max(self.peak_overflow, self.overflow())
+
+    def stats(self) -> dict:
+        """
+        Возвращает текущее состояние пула и накопленные счетчики.
+        """
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "peak_overflow": max(self.peak_overflow, 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": self.waits_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.waits_max * 1000,
+            "wait_total_ms": self.waits_total * 1000,
+        }
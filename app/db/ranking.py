@@ -0,0 +1,28 @@
+from sqlalchemy import Float, cast, func
+from core import settings
+import math
+
+
+def tweet_score(likes_count, created_at):
+    """
+    SQL-выражение рейтинга твита для ранжированной ленты.
+
+    score = log2(1 + likes) + created_at / half_life
+
+    Вклад времени растет линейно, поэтому относительный порядок твитов не
+    меняется со временем, и рейтинг не нужно пересчитывать по расписанию:
+    его достаточно обновлять при лайке и снятии лайка. Твит, набравший вдвое
+    больше лайков, равен по рейтингу более свежему на FEED_RANK_HALF_LIFE_HOURS.
+
+    Args:
+        likes_count: Число лайков (колонка или SQL-выражение)
+        created_at: Время публикации (колонка или func.now())
+
+    Returns:
+        SQL-выражение типа double precision
+    """
+    half_life = settings.FEED_RANK_HALF_LIFE_HOURS * 3600
+    return (
+        func.ln(cast(likes_count, Float) + 1) / math.log(2)
+        + cast(func.extract("epoch", created_at), Float) / half_life
+    )
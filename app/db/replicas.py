@@ -0,0 +1,101 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+from .database import PrimarySession, async_session_maker, engine_options, pool_stats
+from sqlalchemy.exc import DBAPIError
+from typing import Dict, Iterator, Optional, Tuple
+from core.cache import TTLCache
+from sqlalchemy import event
+from fastapi import Request
+from core import settings
+import itertools
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+recent_writers = TTLCache(maxsize=settings.READ_YOUR_WRITES_CACHE_SIZE, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_writer(session: PrimarySession) -> None:
+    api_key = session.info.get("api_key")
+    if api_key:
+        recent_writers.set(api_key, True)
+
+
+class ReplicaRouter:
+    """
+    Распределяет читающие сессии по репликам по кругу.
+
+    Реплика, к которой не удалось подключиться, исключается на DB_REPLICA_RETRY_SECONDS.
+    """
+
+    def __init__(self, urls: list) -> None:
+        self.engines = [create_async_engine(url, **engine_options()) for url in urls]
+        self.session_makers = [async_sessionmaker(engine, class_=AsyncSession) for engine in self.engines]
+        self._down_until = [0.0] * len(urls)
+        self._counter = itertools.count()
+
+    def candidates(self) -> Iterator[Tuple[int, async_sessionmaker]]:
+        """
+        Возвращает доступные реплики, начиная со следующей по кругу.
+        """
+        total = len(self.session_makers)
+        if not total:
+            return
+        start = next(self._counter) % total
+        now = time.monotonic()
+        for offset in range(total):
+            index = (start + offset) % total
+            if self._down_until[index] <= now:
+                yield index, self.session_makers[index]
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+
+replica_router = ReplicaRouter(settings.ASYNC_REPLICA_URLS)
+
+
+def pool_stats_by_engine() -> Dict[str, dict]:
+    """
+    Статистика пулов всех движков: основного ("primary") и реплик ("replica-N"
+    в порядке DB_REPLICA_URLS).
+    """
+    stats = {"primary": pool_stats()}
+    for index, engine in enumerate(replica_router.engines):
+        stats[f"replica-{index}"] = engine.pool.stats()
+    return stats
+
+
+async def _open_replica_session() -> Optional[AsyncSession]:
+    for index, session_maker in replica_router.candidates():
+        session = session_maker()
+        try:
+            await session.connection()
+            return session
+        except (OSError, DBAPIError):
+            logger.warning("Read replica #%d is unavailable, falling back", index)
+            await session.close()
+            replica_router.mark_down(index)
+    return None
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Сессия для читающих эндпоинтов.
+
+    Направляет запрос на реплику (по кругу), а если реплик нет, все недоступны
+    или клиент недавно писал (в течение READ_YOUR_WRITES_SECONDS) - на основную БД.
+    """
+    api_key = request.headers.get("api-key")
+    session = None
+    if not (api_key and recent_writers.get(api_key)):
+        session = await _open_replica_session()
+    if session is None:
+        session = async_session_maker()
+
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -0,0 +1,95 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Integer, select, delete, literal, func
+from .models import Tweet, Follow, Timeline
+from core import settings
+
+
+async def fan_out_tweet(db: AsyncSession, tweet_id: int, author_id: int) -> None:
+    """
+    Добавляет новый твит в домашние ленты всех подписчиков автора.
+
+    Args:
+        db: Асинхронная сессия БД
+        tweet_id: ID опубликованного твита
+        author_id: ID автора твита
+    """
+    followers = (
+        select(Follow.follower_id, literal(tweet_id, Integer))
+        .where(Follow.following_id == author_id)
+    )
+    await db.execute(
+        pg_insert(Timeline)
+        .from_select(["user_id", "tweet_id"], followers)
+        .on_conflict_do_nothing()
+    )
+
+
+async def backfill_timeline(db: AsyncSession, user_id: int, author_id: int) -> None:
+    """
+    Переносит последние твиты автора в ленту нового подписчика.
+
+    Args:
+        db: Асинхронная сессия БД
+        user_id: ID подписавшегося пользователя
+        author_id: ID пользователя, на которого подписались
+    """
+    recent_tweets = (
+        select(literal(user_id, Integer), Tweet.id)
+        .where(Tweet.user_id == author_id)
+        .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+        .limit(settings.TIMELINE_MAX_SIZE)
+    )
+    await db.execute(
+        pg_insert(Timeline)
+        .from_select(["user_id", "tweet_id"], recent_tweets)
+        .on_conflict_do_nothing()
+    )
+
+
+async def remove_author_from_timeline(db: AsyncSession, user_id: int, author_id: int) -> None:
+    """
+    Удаляет твиты автора из ленты пользователя после отписки.
+
+    Args:
+        db: Асинхронная сессия БД
+        user_id: ID отписавшегося пользователя
+        author_id: ID пользователя, от которого отписались
+    """
+    await db.execute(
+        delete(Timeline).where(
+            Timeline.user_id == user_id,
+            Timeline.tweet_id.in_(select(Tweet.id).where(Tweet.user_id == author_id))
+        )
+    )
+
+
+async def timeline_version(db: AsyncSession, user_id: int) -> tuple:
+    """
+    Дешевая версия домашней ленты для ETag.
+
+    Считается по тем же TIMELINE_MAX_SIZE последним записям, что и лента:
+    число и сумма ID твитов меняются при публикации, удалении и подписках,
+    а сумма `tweets.version` - при лайках и готовности вариантов вложений.
+    Запрос читает только индекс `timelines` и строки `tweets` по первичному ключу,
+    без сортировки, авторов, лайков и вложений.
+
+    Args:
+        db: Асинхронная сессия БД
+        user_id: ID владельца ленты
+
+    Returns:
+        tuple: (число твитов, сумма ID, сумма версий)
+    """
+    timeline = (
+        select(Timeline.tweet_id)
+        .where(Timeline.user_id == user_id)
+        .order_by(Timeline.tweet_id.desc())
+        .limit(settings.TIMELINE_MAX_SIZE)
+        .subquery()
+    )
+    result = await db.execute(
+        select(func.count(), func.coalesce(func.sum(Tweet.id), 0), func.coalesce(func.sum(Tweet.version), 0))
+        .join(timeline, timeline.c.tweet_id == Tweet.id)
+    )
+    return tuple(result.one())
@@ -3,4 +3,6 @@
 - пользователей (users)
 - твитов (tweets)
 - загрузки медиа (medias)
+- внутренней статистики сервиса (stats)
+- метрик Prometheus (metrics)
 """
\ No newline at end of file
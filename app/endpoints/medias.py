@@ -1,27 +1,39 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from core.security import get_current_user, get_db, User
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends, HTTPException
+from core.security import get_current_user, get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from db import Media
-import shutil
-import uuid
+from core.storage import save_upload, publish_upload, discard_upload
+from core.images import generate_variants
+from core import metrics
+from db import Media, acquire_blob
+from schemas import CurrentUser
+from core import settings
+import time
 import os
 
 
 router = APIRouter()
 
-UPLOAD_DIR = "media"
+UPLOAD_DIR = settings.MEDIA_DIR
 
 
 @router.post("", status_code=201)
 async def upload_media(
+        background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Загружает изображение на сервер.
 
+    Файл пишется на диск потоково и вне event loop; загрузка обрывается
+    при превышении лимита размера, а тип проверяется по сигнатуре файла.
+    Одинаковые файлы хранятся один раз под своим SHA-256, новые строки `medias`
+    ссылаются на общий файл через `media_blobs`. Уменьшенные копии для ленты
+    строятся после ответа в фоновом пуле процессов.
+
     Args:
+        background_tasks: Фоновые задачи запроса
         file: Загружаемый файл (разрешены: .jpg, .jpeg, .png, .gif, до 10MB)
         db: Сессия БД
         current_user: Текущий пользователь
@@ -31,29 +43,34 @@ async def upload_media(
 
     Raises:
         400: Неподдерживаемый тип файла или превышен размер
+        413: Тело запроса больше MEDIA_MAX_SIZE + MEDIA_FORM_OVERHEAD (до разбора формы)
         401: Пользователь не аутентифицирован
         500: Ошибка сохранения файла
     """
 
     ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
+    started_at = time.perf_counter()
 
     file_ext = os.path.splitext(file.filename)[-1].lower()
     if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(400, "Unsupported file type")
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    file_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = f"{UPLOAD_DIR}/{file_name}"
+    stored = await save_upload(file, file_ext)
 
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except IOError as e:
-        raise HTTPException(500, f"Failed to save file: {str(e)}")
-
-    new_media = Media(file_path=file_name)
-    db.add(new_media)
-    await db.commit()
-    await db.refresh(new_media)
+        await acquire_blob(db, stored.digest, stored.file_path, stored.size)
+        new_media = Media(file_path=stored.file_path, digest=stored.digest)
+        db.add(new_media)
+        await db.commit()
+        await db.refresh(new_media)
+    except Exception:
+        await discard_upload(stored)
+        raise
+
+    await publish_upload(stored, UPLOAD_DIR)
+    background_tasks.add_task(generate_variants, new_media.id, stored.file_path)
+
+    metrics.upload_bytes.observe(stored.size)
+    metrics.upload_duration.observe(time.perf_counter() - started_at)
 
     return {"result": True, "media_id": new_media.id}
@@ -0,0 +1,20 @@
+from starlette.responses import PlainTextResponse
+from core.metrics import exposition
+from fastapi import APIRouter
+
+
+router = APIRouter()
+
+
+@router.get("", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Метрики сервиса в текстовом формате Prometheus.
+
+    При нескольких воркерах uvicorn и заданном METRICS_DIR ответ содержит
+    сумму по всем живым воркерам, а не только по обработавшему запрос.
+
+    Returns:
+        PlainTextResponse: Метрики в формате экспозиции Prometheus 0.0.4
+    """
+    return PlainTextResponse(exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
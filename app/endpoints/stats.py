@@ -0,0 +1,45 @@
+from core.security import get_current_user, auth_cache
+from fastapi import APIRouter, Depends
+from core.graph import follow_graph
+from core.media_gc import media_sweeper
+from schemas import CurrentUser
+from db import pool_stats_by_engine, like_buffer
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_stats(
+    current_user: CurrentUser = Depends(get_current_user)
+) -> dict:
+    """
+    Возвращает внутреннюю статистику сервиса.
+
+    Args:
+        current_user: Текущий аутентифицированный пользователь
+
+    Returns:
+        {
+            "result": bool,
+            "pool": {"size", "checked_out", "overflow", "peak_overflow", "wait_avg_ms", ...},
+            "replica_pools": {"replica-0": {...}, ...},
+            "auth_cache": {"size", "maxsize", "hits", "misses"},
+            "follow_graph": {"loaded", "users", "edges", "bytes", "age_seconds"},
+            "like_buffer": {"enabled", "pending", "flushed", "batches", "rejected", "retrying", "failed"},
+            "media_gc": {"enabled", "runs", "deleted", "files", "reclaimed_bytes", "last_run_age_seconds"}
+        }
+
+    Raises:
+        401: Если пользователь не аутентифицирован
+    """
+    pools = pool_stats_by_engine()
+    return {
+        "result": True,
+        "pool": pools.pop("primary"),
+        "replica_pools": pools,
+        "auth_cache": auth_cache.stats(),
+        "follow_graph": follow_graph.stats(),
+        "like_buffer": like_buffer.stats(),
+        "media_gc": media_sweeper.stats(),
+    }
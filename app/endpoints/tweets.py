@@ -1,20 +1,88 @@
-from fastapi import HTTPException, APIRouter, Depends, status
-from sqlalchemy import select, func, desc, insert, delete
+from fastapi import HTTPException, APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import select, delete, update, tuple_, func, cast, Float
+from sqlalchemy.exc import IntegrityError
 from core.security import get_current_user, get_db, User
 from sqlalchemy.ext.asyncio import AsyncSession
-from db import Tweet, Like, Follow, Media
+from db import Tweet, Like, Media, Timeline, fan_out_tweet, get_read_db, tweet_score, like_buffer, timeline_version
 from sqlalchemy.orm import selectinload
-from schemas import TweetCreate
+from schemas import TweetCreate, CurrentUser
+from core.serialization import RawJSONResponse, encode_tweet, encode_feed
+from core import settings, encode_cursor, decode_cursor, make_etag, etag_matches, not_modified, with_etag
+from typing import List, Literal, Optional
 
 
 router = APIRouter()
 
+FEED_ORDERS = {
+    "likes": (Tweet.likes_count, Tweet.id),
+    "recent": (Tweet.id,),
+    "ranked": (Tweet.score, Tweet.id),
+}
+
+
+def media_url(media: Media, size: str) -> str:
+    """
+    Возвращает URL запрошенного варианта изображения, а пока он не готов - оригинала.
+    """
+    if size == "thumbnail" and media.thumbnail_path:
+        return f"/media/{media.thumbnail_path}"
+    if size == "medium" and media.medium_path:
+        return f"/media/{media.medium_path}"
+    return f"/media/{media.file_path}"
+
+
+def render_tweets(rows: List[tuple], media_size: str) -> list:
+    """
+    Готовит твиты к выдаче: при FAST_JSON - сериализованные фрагменты, иначе словари.
+
+    Args:
+        rows: Пары (Tweet, author_name) с загруженными attachments и liked_by
+        media_size: Вариант изображений во вложениях
+
+    Returns:
+        list: Твиты в формате ленты
+    """
+    tweets_out = []
+    for tweet, author_name in rows:
+        attachments = [media_url(media, media_size) for media in tweet.attachments]
+
+        if settings.FAST_JSON:
+            tweets_out.append(encode_tweet(tweet, author_name, attachments))
+            continue
+
+        likes_info = [
+            {"user_id": user.id, "name": user.name}
+            for user in sorted(tweet.liked_by, key=lambda user: user.id)
+        ]
+
+        tweets_out.append({
+            "id": tweet.id,
+            "content": tweet.content,
+            "author": {
+                "id": tweet.user_id,
+                "name": author_name
+            },
+            "likes": likes_info,
+            "attachments": attachments
+        })
+    return tweets_out
+
+
+def tweets_response(tweets_out: list, next_cursor: Optional[str]):
+    """
+    Собирает ответ со списком твитов и курсором следующей страницы.
+    """
+    if settings.FAST_JSON:
+        return RawJSONResponse(encode_feed(tweets_out, next_cursor))
+    return {"result": True, "tweets": tweets_out, "next_cursor": next_cursor}
+
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_tweet(
     tweet_in: TweetCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Создает новый твит для текущего пользователя.
@@ -30,16 +98,32 @@ async def create_tweet(
     Raises:
         401: Если пользователь не аутентифицирован
     """
-    new_tweet = Tweet(user_id=current_user.id, content=tweet_in.tweet_data)
+    new_tweet = Tweet(
+        user_id=current_user.id,
+        content=tweet_in.tweet_data,
+        score=tweet_score(0, func.now())
+    )
 
     if tweet_in.tweet_media_ids:
+        # FOR KEY SHARE держит медиа до commit: сборщик (core.media_gc) выбирает
+        # строки через FOR UPDATE SKIP LOCKED и пропустит их, а не удалит между
+        # этим чтением и вставкой в tweets_medias
         result = await db.execute(
-            select(Media).where(Media.id.in_(tweet_in.tweet_media_ids))
+            select(Media)
+            .where(Media.id.in_(tweet_in.tweet_media_ids))
+            .with_for_update(read=True, key_share=True)
         )
         media_objects = result.scalars().all()
         new_tweet.attachments.extend(media_objects)
 
     db.add(new_tweet)
+    await db.flush()
+    await fan_out_tweet(db, new_tweet.id, current_user.id)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(tweets_count=User.tweets_count + 1, version=User.version + 1)
+    )
     await db.commit()
     await db.refresh(new_tweet)
 
@@ -50,11 +134,15 @@ async def create_tweet(
 async def delete_tweet(
     tweet_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Удаляет твит по ID, если он принадлежит текущему пользователю.
 
+    Удаление и счетчик автора - один запрос `DELETE ... WHERE id AND user_id RETURNING`
+    без загрузки твита в ORM; лайки, вложения и записи лент удаляются каскадом в БД.
+    Только если ничего не удалено, отдельный запрос различает 403 и 404.
+
     Args:
         tweet_id: ID твита для удаления
         db: Асинхронная сессия БД
@@ -68,20 +156,25 @@ async def delete_tweet(
         404: Если твит не найден
         401: Если пользователь не аутентифицирован
     """
+    deleted = (
+        delete(Tweet)
+        .where(Tweet.id == tweet_id, Tweet.user_id == current_user.id)
+        .returning(Tweet.user_id)
+        .cte("deleted")
+    )
     result = await db.execute(
-        select(Tweet).where(Tweet.id == tweet_id)
+        update(User)
+        .where(User.id.in_(select(deleted.c.user_id)))
+        .values(tweets_count=User.tweets_count - 1, version=User.version + 1)
+        .returning(User.id)
     )
-    tweet = result.scalar_one_or_none()
-
-    if tweet is None:
-        raise HTTPException(status_code=404, detail="Tweet not found")
-
-    if tweet.user_id != current_user.id:
+    if result.first() is None:
+        owner = await db.scalar(select(Tweet.user_id).where(Tweet.id == tweet_id))
+        if owner is None:
+            raise HTTPException(status_code=404, detail="Tweet not found")
         raise HTTPException(status_code=403, detail="Not your tweet")
 
-    await db.delete(tweet)
     await db.commit()
-
     return {"result": True}
 
 
@@ -89,11 +182,18 @@ async def delete_tweet(
 async def like_tweet(
     tweet_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Добавляет лайк текущего пользователя к твиту.
 
+    При LIKE_WRITE_BEHIND лайк ставится в очередь и записывается пакетом
+    (см. db.like_buffer), а при переполнении очереди - сразу. Существование
+    твита проверяется до постановки в очередь, чтобы 404 не зависел от режима.
+
+    Операция идемпотентна: лайк и счетчик пишутся одним запросом
+    (INSERT ... ON CONFLICT DO NOTHING в CTE), повторный лайк ничего не меняет.
+
     Args:
         tweet_id: ID твита для лайка
         db: Асинхронная сессия БД
@@ -104,11 +204,34 @@ async def like_tweet(
 
     Raises:
         401: Если пользователь не аутентифицирован
+        404: Если твит не найден
     """
-    stmt = insert(Like).values(user_id=current_user.id, tweet_id=tweet_id)
-
-    await db.execute(stmt)
-    await db.commit()
+    if settings.LIKE_WRITE_BEHIND:
+        if await db.scalar(select(Tweet.id).where(Tweet.id == tweet_id)) is None:
+            raise HTTPException(status_code=404, detail="Tweet not found")
+        if like_buffer.enqueue(current_user.id, tweet_id, True):
+            return {"result": True}
+
+    liked = (
+        pg_insert(Like)
+        .values(user_id=current_user.id, tweet_id=tweet_id)
+        .on_conflict_do_nothing()
+        .returning(Like.tweet_id)
+        .cte("liked")
+    )
+    try:
+        await db.execute(
+            update(Tweet)
+            .where(Tweet.id.in_(select(liked.c.tweet_id)))
+            .values(
+                likes_count=Tweet.likes_count + 1,
+                score=tweet_score(Tweet.likes_count + 1, Tweet.created_at),
+                version=Tweet.version + 1
+            )
+        )
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail="Tweet not found")
 
     return {"result": True}
 
@@ -117,11 +240,14 @@ async def like_tweet(
 async def unlike_tweet(
     tweet_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Удаляет лайк текущего пользователя с твита.
 
+    При LIKE_WRITE_BEHIND снятие лайка ставится в очередь, как и в like_tweet.
+    Иначе удаление лайка и счетчик - один запрос; повторное снятие ничего не меняет.
+
     Args:
         tweet_id: ID твита для удаления лайка
         db: Асинхронная сессия БД
@@ -133,27 +259,141 @@ async def unlike_tweet(
     Raises:
         401: Если пользователь не аутентифицирован
     """
-    stmt = delete(Like).where(
-        Like.user_id == current_user.id,
-        Like.tweet_id == tweet_id
+    if settings.LIKE_WRITE_BEHIND and like_buffer.enqueue(current_user.id, tweet_id, False):
+        return {"result": True}
+
+    unliked = (
+        delete(Like)
+        .where(Like.user_id == current_user.id, Like.tweet_id == tweet_id)
+        .returning(Like.tweet_id)
+        .cte("unliked")
+    )
+    await db.execute(
+        update(Tweet)
+        .where(Tweet.id.in_(select(unliked.c.tweet_id)))
+        .values(
+            likes_count=Tweet.likes_count - 1,
+            score=tweet_score(Tweet.likes_count - 1, Tweet.created_at),
+            version=Tweet.version + 1
+        )
     )
-
-    await db.execute(stmt)
     await db.commit()
 
     return {"result": True}
 
 
+@router.get("/search", response_model=dict)
+async def search_tweets(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    media_size: Literal["thumbnail", "medium", "original"] = Query("medium"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> dict:
+    """
+    Полнотекстовый поиск по твитам.
+
+    Запрос разбирается websearch_to_tsquery ("слова в кавычках", OR, -исключение)
+    и ищется по генерируемой колонке `tweets.search_vector` с GIN-индексом.
+    Ранжируются только SEARCH_MAX_CANDIDATES самых новых совпадений, поэтому
+    стоимость запроса не растет с размером таблицы и частотой слова.
+
+    Args:
+        q: Поисковый запрос
+        limit: Размер страницы
+        cursor: Курсор следующей страницы из предыдущего ответа
+        media_size: Вариант изображений во вложениях (thumbnail, medium, original)
+        db: Асинхронная сессия БД (реплика для чтения)
+        current_user: Текущий аутентифицированный пользователь
+
+    Returns:
+        {"result": bool, "tweets": List[...], "next_cursor": Optional[str]} - в формате ленты,
+        по убыванию релевантности
+
+    Raises:
+        400: Если курсор поврежден
+        401: Если пользователь не аутентифицирован
+    """
+    after = decode_cursor(cursor, (float, int)) if cursor else None
+
+    query = func.websearch_to_tsquery("simple", q)
+    candidates = (
+        select(Tweet.id)
+        .where(Tweet.search_vector.bool_op("@@")(query))
+        .order_by(Tweet.id.desc())
+        .limit(settings.SEARCH_MAX_CANDIDATES)
+        .subquery()
+    )
+    rank = cast(func.ts_rank(Tweet.search_vector, query), Float)
+
+    stmt = (
+        select(Tweet, User.name.label("author_name"), rank.label("rank"))
+        .join(candidates, candidates.c.id == Tweet.id)
+        .join(User, Tweet.user_id == User.id)
+        .order_by(rank.desc(), Tweet.id.desc())
+        .limit(limit + 1)
+        .options(
+            selectinload(Tweet.attachments),
+            selectinload(Tweet.liked_by).load_only(User.id, User.name)
+        )
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, Tweet.id) < tuple_(*after))
+
+    result = await db.execute(stmt)
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_tweet, _, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_tweet.id)
+
+    tweets_out = render_tweets([(tweet, author_name) for tweet, author_name, _ in rows], media_size)
+    return tweets_response(tweets_out, next_cursor)
+
+
 @router.get("", response_model=dict)
 async def get_feed(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    order: Literal["likes", "recent", "ranked"] = Query("likes"),
+    media_size: Literal["thumbnail", "medium", "original"] = Query("medium"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Получает ленту твитов пользователей, на которых подписан текущий пользователь.
 
+    Лента читается из материализованной таблицы `timelines`, которая заполняется
+    при публикации твита, поэтому стоимость запроса ограничена TIMELINE_MAX_SIZE
+    последними записями, а не всеми твитами авторов.
+
+    Порядок задается параметром `order`:
+        - likes: по денормализованному счетчику `tweets.likes_count`
+        - recent: хронологически, сначала новые
+        - ranked: по рейтингу `tweets.score` (лайки с затуханием по времени,
+          см. db.ranking.tweet_score)
+
+    Пагинация курсорная: следующая страница запрашивается с `next_cursor`
+    из предыдущего ответа, и запрос продолжает выборку с ключа сортировки
+    без OFFSET. Курсор действителен только для того же `order`.
+
+    Ответ содержит ETag по версии ленты (см. db.timeline.timeline_version) и
+    параметрам запроса. Если клиент присылает его в If-None-Match и лента не
+    менялась, возвращается 304 без основного запроса и сериализации.
+
     Args:
-        db: Асинхронная сессия БД
+        request: HTTP-запрос (заголовок If-None-Match)
+        response: HTTP-ответ для заголовка ETag
+        limit: Размер страницы
+        cursor: Курсор следующей страницы из предыдущего ответа
+        order: Порядок ленты (likes, recent, ranked)
+        media_size: Вариант изображений во вложениях (thumbnail, medium, original)
+        db: Асинхронная сессия БД (реплика для чтения)
         current_user: Текущий аутентифицированный пользователь
 
     Returns:
@@ -165,35 +405,43 @@ async def get_feed(
                 "author": {"id": int, "name": str},
                 "likes": List[{"user_id": int, "name": str}],
                 "attachments": List[str]
-            }]
+            }],
+            "next_cursor": Optional[str]
         }
+        304 без тела, если If-None-Match совпал с текущим ETag
 
     Raises:
+        400: Если курсор поврежден
         401: Если пользователь не аутентифицирован
     """
+    sort_key = FEED_ORDERS[order]
+    after = decode_cursor(cursor, tuple(column.type.python_type for column in sort_key)) if cursor else None
+
     try:
-        following_result = await db.execute(
-            select(Follow.following_id)
-            .where(Follow.follower_id == current_user.id)
+        version = await timeline_version(db, current_user.id)
+        etag = make_etag("feed", current_user.id, version, limit, cursor, order, media_size)
+        if etag_matches(request, etag):
+            return not_modified(etag, private=True)
+
+        timeline = (
+            select(Timeline.tweet_id)
+            .where(Timeline.user_id == current_user.id)
+            .order_by(Timeline.tweet_id.desc())
+            .limit(settings.TIMELINE_MAX_SIZE)
+            .subquery()
         )
-        following_ids = following_result.scalars().all()
-
-        if not following_ids:
-            return {"result": True, "tweets": []}
 
         stmt = (
-            select(
-                Tweet,
-                User.name.label("author_name"),
-                func.count(Like.user_id).label("likes_count")
-            )
+            select(Tweet, User.name.label("author_name"))
+            .join(timeline, timeline.c.tweet_id == Tweet.id)
             .join(User, Tweet.user_id == User.id)
-            .outerjoin(Like, Like.tweet_id == Tweet.id)
-            .where(Tweet.user_id.in_(following_ids))
-            .group_by(Tweet.id, User.name)
-            .order_by(desc("likes_count"))
+            .order_by(*[column.desc() for column in sort_key])
+            .limit(limit + 1)
         )
 
+        if after is not None:
+            stmt = stmt.where(tuple_(*sort_key) < tuple_(*after))
+
         stmt = stmt.options(
             selectinload(Tweet.attachments),
             selectinload(Tweet.liked_by).load_only(User.id, User.name)
@@ -202,27 +450,14 @@ async def get_feed(
         result = await db.execute(stmt)
         tweets_data = result.all()
 
-        tweets_out = []
-        for tweet, author_name, likes_count in tweets_data:
-            likes_info = [
-                {"user_id": user.id, "name": user.name}
-                for user in tweet.liked_by
-            ]
-
-            attachments = [f"/media/{media.file_path}" for media in tweet.attachments]
-
-            tweets_out.append({
-                "id": tweet.id,
-                "content": tweet.content,
-                "author": {
-                    "id": tweet.user_id,
-                    "name": author_name
-                },
-                "likes": likes_info,
-                "attachments": attachments
-            })
-
-        return {"result": True, "tweets": tweets_out}
+        next_cursor = None
+        if len(tweets_data) > limit:
+            tweets_data = tweets_data[:limit]
+            last_tweet = tweets_data[-1][0]
+            next_cursor = encode_cursor(*[getattr(last_tweet, column.key) for column in sort_key])
+
+        tweets_out = render_tweets(tweets_data, media_size)
+        return with_etag(tweets_response(tweets_out, next_cursor), response, etag, private=True)
 
     except Exception as e:
         return {
@@ -1,11 +1,17 @@
 from core.security import get_current_user, get_db, User
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import delete, select, update, case
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import selectinload
-from schemas import UserResponse
-from db import Follow
+from sqlalchemy.orm import selectinload, load_only, noload
+from schemas import UserResponse, FollowListResponse, CurrentUser
+from db import Follow, backfill_timeline, remove_author_from_timeline, get_read_db
+from core.serialization import FastJSONResponse, profile_payload
+from core import settings, encode_cursor, decode_cursor, make_etag, etag_matches, not_modified, with_etag
+from core.graph import follow_graph
+from typing import List, Literal, Optional
+import bisect
 
 
 router = APIRouter()
@@ -15,7 +21,7 @@ router = APIRouter()
 async def follow_user(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Подписаться на пользователя.
@@ -25,25 +31,46 @@ async def follow_user(
         db: Асинхронная сессия БД
         current_user: Текущий аутентифицированный пользователь
 
+    Операция идемпотентна: повторная подписка ничего не меняет и возвращает успех.
+    Подписка и оба счетчика пишутся одним запросом (INSERT ... ON CONFLICT DO NOTHING
+    в CTE), а лента дозаполняется, только если подписка действительно добавлена.
+
     Returns:
         {"result": bool} - Результат операции
 
     Raises:
-        400: Bad Request - если:
-            - Попытка подписаться на себя
-            - Уже подписаны на пользователя
+        400: Bad Request - при попытке подписаться на себя
         401: Unauthorized - если пользователь не аутентифицирован
+        404: Not Found - если пользователь не найден
     """
     if current_user.id == id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
 
-    stmt = insert(Follow).values(follower_id=current_user.id, following_id=id)
+    followed = (
+        pg_insert(Follow)
+        .values(follower_id=current_user.id, following_id=id)
+        .on_conflict_do_nothing()
+        .returning(Follow.follower_id, Follow.following_id)
+        .cte("followed")
+    )
     try:
-        await db.execute(stmt)
+        result = await db.execute(
+            update(User)
+            .where(User.id.in_(select(followed.c.follower_id).union_all(select(followed.c.following_id))))
+            .values(
+                following_count=User.following_count + case((User.id == current_user.id, 1), else_=0),
+                followers_count=User.followers_count + case((User.id == id, 1), else_=0),
+                version=User.version + 1
+            )
+            .returning(User.id)
+        )
+        if result.first() is not None:
+            await backfill_timeline(db, current_user.id, id)
         await db.commit()
     except IntegrityError:
-        raise HTTPException(status_code=400, detail="Already following")
+        raise HTTPException(status_code=404, detail="User not found")
 
+    follow_graph.add(current_user.id, id)
     return {"result": True}
 
 
@@ -51,11 +78,14 @@ async def follow_user(
 async def unfollow_user(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
     """
     Отписаться от пользователя.
 
+    Операция идемпотентна: удаление подписки и обоих счетчиков - один запрос,
+    счетчики меняются, только если подписка была.
+
     Args:
         id: ID пользователя для отписки
         db: Асинхронная сессия БД
@@ -67,66 +97,364 @@ async def unfollow_user(
     Raises:
         401: Unauthorized - если пользователь не аутентифицирован
     """
-    stmt = delete(Follow).where(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == id
+    unfollowed = (
+        delete(Follow)
+        .where(Follow.follower_id == current_user.id, Follow.following_id == id)
+        .returning(Follow.follower_id, Follow.following_id)
+        .cte("unfollowed")
+    )
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(select(unfollowed.c.follower_id).union_all(select(unfollowed.c.following_id))))
+        .values(
+            following_count=User.following_count - case((User.id == current_user.id, 1), else_=0),
+            followers_count=User.followers_count - case((User.id == id, 1), else_=0),
+            version=User.version + 1
+        )
+        .returning(User.id)
     )
-    await db.execute(stmt)
+    if result.first() is not None:
+        await remove_author_from_timeline(db, current_user.id, id)
     await db.commit()
+    follow_graph.remove(current_user.id, id)
     return {"result": True}
 
 
+async def follow_page(
+    db: AsyncSession,
+    user_id: int,
+    direction: str,
+    limit: int,
+    after: Optional[int] = None
+) -> List[dict]:
+    """
+    Читает страницу подписчиков или подписок пользователя в порядке ID.
+
+    Args:
+        db: Асинхронная сессия БД
+        user_id: ID пользователя, чей список читается
+        direction: "followers" или "following"
+        limit: Максимальное число записей
+        after: ID последнего пользователя предыдущей страницы
+
+    Returns:
+        List[dict]: Пользователи в формате {"id": int, "name": str}
+    """
+    if direction == "followers":
+        owner_column, other_column = Follow.following_id, Follow.follower_id
+    else:
+        owner_column, other_column = Follow.follower_id, Follow.following_id
+
+    stmt = (
+        select(User.id, User.name)
+        .join(Follow, other_column == User.id)
+        .where(owner_column == user_id)
+        .order_by(other_column)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(other_column > after)
+
+    result = await db.execute(stmt)
+    return [{"id": row.id, "name": row.name} for row in result]
+
+
+async def load_profile(db: AsyncSession, user_id: int, mode: str, preview: int) -> Optional[dict]:
+    """
+    Загружает профиль пользователя.
+
+    Args:
+        db: Асинхронная сессия БД
+        user_id: ID пользователя
+        mode: "full" - полные списки подписчиков и подписок,
+              "counts" - только счетчики и первые `preview` записей списков
+        preview: Размер превью списков в режиме "counts"
+
+    Returns:
+        Optional[dict]: Данные в формате UserProfile или None, если пользователя нет
+    """
+    if mode == "full":
+        result = await db.execute(
+            select(User)
+            .where(User.id == user_id)
+            .options(
+                selectinload(User.followers).options(load_only(User.id, User.name), noload("*")),
+                selectinload(User.following).options(load_only(User.id, User.name), noload("*")),
+                noload("*")
+            )
+        )
+        user = result.scalar_one_or_none()
+        return profile_payload(user) if user else None
+
+    result = await db.execute(
+        select(User.id, User.name, User.followers_count, User.following_count, User.tweets_count)
+        .where(User.id == user_id)
+    )
+    row = result.first()
+    if not row:
+        return None
+
+    profile = dict(row._mapping)
+    profile["followers"] = await follow_page(db, user_id, "followers", preview) if preview else []
+    profile["following"] = await follow_page(db, user_id, "following", preview) if preview else []
+    return profile
+
+
+def profile_response(profile: dict):
+    """
+    Отдает профиль через orjson напрямую или через UserResponse, если FAST_JSON выключен.
+    """
+    if settings.FAST_JSON:
+        return FastJSONResponse({"result": True, "user": profile})
+    return UserResponse(user=profile)
+
+
+async def profile_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Версия профиля для ETag: `users.version` увеличивается вместе со счетчиками
+    при подписке, отписке, публикации и удалении твита.
+
+    Returns:
+        Optional[int]: Версия или None, если пользователя нет
+    """
+    return await db.scalar(select(User.version).where(User.id == user_id))
+
+
+async def ensure_user_exists(db: AsyncSession, user_id: int) -> None:
+    """
+    Проверяет, что пользователь существует; вызывается, когда список пуст.
+
+    Raises:
+        HTTPException: 404 - если пользователь не найден
+    """
+    exists = await db.execute(select(User.id).where(User.id == user_id))
+    if exists.first() is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "result": False,
+                "error_type": "not_found",
+                "error_message": "User not found"
+            }
+        )
+
+
+def follow_list_page(users: List[dict], limit: int) -> FollowListResponse:
+    """
+    Обрезает список, прочитанный с запасом в одну запись, и строит курсор.
+
+    Args:
+        users: До limit + 1 пользователей в порядке ID
+        limit: Размер страницы
+
+    Returns:
+        FollowListResponse: Пользователи и курсор следующей страницы
+    """
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1]["id"])
+    return FollowListResponse(users=users, next_cursor=next_cursor)
+
+
+async def follow_list(
+    db: AsyncSession,
+    user_id: int,
+    direction: str,
+    limit: int,
+    cursor: Optional[str]
+) -> FollowListResponse:
+    """
+    Общая реализация /{id}/followers и /{id}/following.
+
+    Raises:
+        HTTPException: 400 - если курсор поврежден, 404 - если пользователь не найден
+    """
+    after = decode_cursor(cursor, (int,))[0] if cursor else None
+
+    users = await follow_page(db, user_id, direction, limit + 1, after)
+
+    if not users and after is None:
+        await ensure_user_exists(db, user_id)
+    return follow_list_page(users, limit)
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_me(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    mode: Literal["full", "counts"] = Query("full"),
+    preview: int = Query(0, ge=0, le=settings.PROFILE_PREVIEW_MAX),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> UserResponse:
     """
     Получить профиль текущего пользователя.
 
+    Поддерживает условный GET, как и /{id}.
+
     Args:
-        db: Асинхронная сессия БД
+        request: HTTP-запрос (заголовок If-None-Match)
+        response: HTTP-ответ для заголовка ETag
+        mode: "full" - полные списки, "counts" - только счетчики и превью
+        preview: Размер превью списков в режиме "counts"
+        db: Асинхронная сессия БД (реплика для чтения)
         current_user: Текущий аутентифицированный пользователь
 
     Returns:
         UserResponse: Полная информация о пользователе включая:
-            - Основные данные
-            - Список подписчиков
-            - Список подписок
+            - Основные данные и счетчики
+            - Список подписчиков (в режиме "counts" - превью)
+            - Список подписок (в режиме "counts" - превью)
 
     Raises:
         401: Unauthorized - если пользователь не аутентифицирован
     """
-    result = await db.execute(
-        select(User)
-        .where(User.id == current_user.id)
-        .options(
-            selectinload(User.followers),
-            selectinload(User.following)
+    version = await profile_version(db, current_user.id)
+    etag = make_etag("me", current_user.id, version, mode, preview)
+    if etag_matches(request, etag):
+        return not_modified(etag, private=True)
+
+    profile = await load_profile(db, current_user.id, mode, preview)
+    return with_etag(profile_response(profile), response, etag, private=True)
+
+
+@router.get("/{id}/followers", response_model=FollowListResponse)
+async def get_followers(
+    id: int,
+    limit: int = Query(settings.FOLLOW_PAGE_SIZE, ge=1, le=settings.FOLLOW_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+) -> FollowListResponse:
+    """
+    Постраничный список подписчиков пользователя.
+
+    Args:
+        id: ID пользователя
+        limit: Размер страницы
+        cursor: Курсор следующей страницы из предыдущего ответа
+        db: Асинхронная сессия БД (реплика для чтения)
+
+    Returns:
+        FollowListResponse: Пользователи и курсор следующей страницы
+
+    Raises:
+        400: Bad Request - если курсор поврежден
+        404: Not Found - если пользователь не найден
+    """
+    return await follow_list(db, id, "followers", limit, cursor)
+
+
+@router.get("/{id}/following", response_model=FollowListResponse)
+async def get_following(
+    id: int,
+    limit: int = Query(settings.FOLLOW_PAGE_SIZE, ge=1, le=settings.FOLLOW_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+) -> FollowListResponse:
+    """
+    Постраничный список подписок пользователя.
+
+    Args:
+        id: ID пользователя
+        limit: Размер страницы
+        cursor: Курсор следующей страницы из предыдущего ответа
+        db: Асинхронная сессия БД (реплика для чтения)
+
+    Returns:
+        FollowListResponse: Пользователи и курсор следующей страницы
+
+    Raises:
+        400: Bad Request - если курсор поврежден
+        404: Not Found - если пользователь не найден
+    """
+    return await follow_list(db, id, "following", limit, cursor)
+
+
+@router.get("/{id}/mutuals", response_model=FollowListResponse)
+async def get_mutuals(
+    id: int,
+    limit: int = Query(settings.FOLLOW_PAGE_SIZE, ge=1, le=settings.FOLLOW_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+) -> FollowListResponse:
+    """
+    Постраничный список взаимных подписок: пользователь подписан на них, а они - на него.
+
+    При загруженном графе подписок пересечение считается в памяти,
+    а из БД читаются только имена; иначе используется SQL.
+
+    Args:
+        id: ID пользователя
+        limit: Размер страницы
+        cursor: Курсор следующей страницы из предыдущего ответа
+        db: Асинхронная сессия БД (реплика для чтения)
+
+    Returns:
+        FollowListResponse: Пользователи в порядке ID и курсор следующей страницы
+
+    Raises:
+        400: Bad Request - если курсор поврежден
+        404: Not Found - если пользователь не найден
+    """
+    after = decode_cursor(cursor, (int,))[0] if cursor else None
+
+    if follow_graph.loaded:
+        user_ids = follow_graph.mutuals(id)
+        if after is not None:
+            user_ids = user_ids[bisect.bisect_right(user_ids, after):]
+        condition = User.id.in_(user_ids[:limit + 1])
+    else:
+        condition = User.id.in_(
+            select(Follow.following_id)
+            .where(
+                Follow.follower_id == id,
+                Follow.following_id.in_(select(Follow.follower_id).where(Follow.following_id == id))
+            )
         )
-    )
-    user = result.scalar_one()
+        if after is not None:
+            condition = condition & (User.id > after)
 
-    return UserResponse(user=user)
+    result = await db.execute(select(User.id, User.name).where(condition).order_by(User.id).limit(limit + 1))
+    users = [{"id": row.id, "name": row.name} for row in result]
+    if not users and after is None:
+        await ensure_user_exists(db, id)
+    return follow_list_page(users, limit)
 
 
 @router.get("/{id}", response_model=UserResponse)
 async def get_user_profile(
     id: int,
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    mode: Literal["full", "counts"] = Query("full"),
+    preview: int = Query(0, ge=0, le=settings.PROFILE_PREVIEW_MAX),
+    db: AsyncSession = Depends(get_read_db)
 ) -> UserResponse:
     """
     Получить профиль пользователя по ID.
 
+    Для аккаунтов с большим числом подписчиков используйте mode=counts:
+    профиль вернется со счетчиками и превью, а полные списки доступны
+    постранично через /{id}/followers и /{id}/following.
+
+    Ответ содержит ETag по версии профиля. Клиент, приславший его в If-None-Match,
+    получает 304 после одного чтения `users` по первичному ключу, без загрузки списков.
+
     Args:
         id: ID запрашиваемого пользователя
-        db: Асинхронная сессия БД
+        request: HTTP-запрос (заголовок If-None-Match)
+        response: HTTP-ответ для заголовка ETag
+        mode: "full" - полные списки, "counts" - только счетчики и превью
+        preview: Размер превью списков в режиме "counts"
+        db: Асинхронная сессия БД (реплика для чтения)
 
     Returns:
         UserResponse: Полная информация о пользователе включая:
-            - Основные данные
-            - Список подписчиков
-            - Список подписок
+            - Основные данные и счетчики
+            - Список подписчиков (в режиме "counts" - превью)
+            - Список подписок (в режиме "counts" - превью)
+        304 без тела, если If-None-Match совпал с текущим ETag
 
     Raises:
         404: Not Found - если пользователь не найден
@@ -137,17 +465,15 @@ async def get_user_profile(
                 "error_message": "User not found"
             }
     """
-    result = await db.execute(
-        select(User)
-        .where(User.id == id)
-        .options(
-            selectinload(User.followers),
-            selectinload(User.following)
-        )
-    )
-    user = result.scalar_one_or_none()
+    profile = None
+    version = await profile_version(db, id)
+    if version is not None:
+        etag = make_etag("profile", id, version, mode, preview)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        profile = await load_profile(db, id, mode, preview)
 
-    if not user:
+    if not profile:
         raise HTTPException(
             status_code=404,
             detail={
@@ -157,4 +483,4 @@ async def get_user_profile(
             }
         )
 
-    return UserResponse(user=user)
+    return with_etag(profile_response(profile), response, etag)
@@ -1,15 +1,71 @@
 from fastapi.staticfiles import StaticFiles
-from endpoints import users, medias, tweets
+from endpoints import users, medias, tweets, stats, metrics
+from core.images import shutdown_variant_pool
+from core.graph import load_follow_graph, refresh_follow_graph
+from core.media_gc import sweep_orphaned_media
+from core.metrics import MetricsMiddleware, flush_metrics
+from core.profiling import ProfilingMiddleware, profiling_enabled
+from core.serialization import FastJSONResponse
+from core.media_files import MediaFiles
+from core.storage import UploadLimitMiddleware
+from contextlib import asynccontextmanager
+from core import QueryStatsMiddleware, settings
+from db import like_buffer
 from fastapi import FastAPI
+import logging
+import asyncio
 import os
 
 
-app = FastAPI(title="Twitter", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background_tasks = []
+    if settings.GRAPH_INDEX_ENABLED:
+        try:
+            await load_follow_graph()
+        except Exception:
+            logger.exception("Follow graph is not loaded, falling back to SQL")
+        if settings.GRAPH_REFRESH_SECONDS > 0:
+            background_tasks.append(asyncio.create_task(refresh_follow_graph()))
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        background_tasks.append(asyncio.create_task(flush_metrics()))
+    if settings.MEDIA_GC_ENABLED and settings.MEDIA_GC_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(sweep_orphaned_media()))
+    if settings.LIKE_WRITE_BEHIND:
+        like_buffer.start()
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await like_buffer.stop()
+    shutdown_variant_pool()
+
+
+app = FastAPI(
+    title="Twitter",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(UploadLimitMiddleware, path_prefix="/api/medias")
+app.add_middleware(QueryStatsMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(tweets.router, prefix="/api/tweets", tags=["tweets"])
 app.include_router(medias.router, prefix="/api/medias", tags=["medias"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
-app.mount("/media", StaticFiles(directory=os.path.join(BASE_DIR, "app", "media")), name="media")
+app.mount("/media", MediaFiles(directory=os.path.join(BASE_DIR, "app", "media")), name="media")
 app.mount("/", StaticFiles(directory=os.path.join(BASE_DIR, "app", "static"), html=True), name="static")
@@ -5,8 +5,8 @@
 """
 
 
-from .user import UserProfile, UserResponse
+from .user import UserProfile, UserResponse, FollowListResponse, CurrentUser
 from .tweet import TweetCreate
 
 
-__all__ = ["UserProfile", "UserResponse", "TweetCreate"]
+__all__ = ["UserProfile", "UserResponse", "FollowListResponse", "CurrentUser", "TweetCreate"]
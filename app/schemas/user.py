@@ -1,5 +1,11 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List
+from typing import List, Optional
+
+
+class CurrentUser(BaseModel):
+    id: int
+    name: str
+    model_config = ConfigDict(frozen=True)
 
 
 class FollowerInfo(BaseModel):
@@ -17,6 +23,9 @@ class FollowingInfo(BaseModel):
 class UserProfile(BaseModel):
     id: int
     name: str
+    followers_count: int = 0
+    following_count: int = 0
+    tweets_count: int = 0
     followers: List[FollowerInfo] = []
     following: List[FollowingInfo] = []
     model_config = ConfigDict(from_attributes=True)
@@ -32,9 +41,18 @@ class UserResponse(BaseModel):
                 "user": {
                     "id": 1,
                     "name": "Иван Иванов",
+                    "followers_count": 1,
+                    "following_count": 1,
+                    "tweets_count": 12,
                     "followers": [{"id": 2, "name": "Петр Петров"}],
                     "following": [{"id": 3, "name": "Сидор Сидоров"}]
                 }
             }
         }
     )
+
+
+class FollowListResponse(BaseModel):
+    result: bool = True
+    users: List[FollowerInfo]
+    next_cursor: Optional[str] = None
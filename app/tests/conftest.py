@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from core import SettingsConfigDict, Settings
 from httpx import AsyncClient, ASGITransport
-from db import get_db, Base, User
+from db import get_db, get_read_db, Base, User
 from dotenv import find_dotenv
 from main import app
 import pytest
@@ -26,6 +26,7 @@ async def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -43,10 +44,23 @@ async def db():
         yield session
 
 
+async def enforce_query_budget(response):
+    """Валит тест, если маршрут выполнил больше SQL-запросов, чем разрешает QUERY_BUDGET."""
+    queries = int(response.headers.get("X-DB-Queries", 0))
+    assert queries <= test_settings.QUERY_BUDGET, (
+        f"{response.request.method} {response.request.url.path} "
+        f"executed {queries} queries, budget is {test_settings.QUERY_BUDGET}"
+    )
+
+
 @pytest.fixture(scope='session', autouse=True)
 async def client():
     transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as c:
+    async with AsyncClient(
+        transport=transport,
+        base_url="http://test",
+        event_hooks={"response": [enforce_query_budget]}
+    ) as c:
         yield c
 
 
@@ -0,0 +1,42 @@
+from core.graph import FollowGraph
+
+
+def test_follow_graph_operations():
+    """Тест графа подписок в памяти"""
+    graph = FollowGraph()
+    graph.build([(1, 2), (1, 3), (2, 1), (3, 1), (3, 2)])
+
+    assert graph.is_following(1, 3)
+    assert not graph.is_following(2, 3)
+    assert list(graph.followers_of(2)) == [1, 3]
+    assert graph.mutuals(1) == [2, 3]
+    assert graph.mutuals(1, 3) == [2]
+
+    graph.add(2, 3)
+    graph.add(2, 3)
+    graph.remove(1, 2)
+    assert list(graph.following_of(2)) == [1, 3]
+    assert list(graph.followers_of(2)) == [3]
+    assert graph.mutuals(1) == [3]
+    assert graph.stats()["edges"] == 5
+
+
+def test_follow_graph_replays_changes_during_load():
+    """Тест повтора follow/unfollow, выполненных во время загрузки графа"""
+    graph = FollowGraph()
+    graph.build([(1, 2)])
+
+    graph.begin_load()
+    graph.add(1, 3)
+    graph.remove(1, 2)
+    graph.add(2, 1)
+    graph.remove(2, 1)
+    graph.build([(1, 2), (2, 1)])
+
+    assert list(graph.following_of(1)) == [3]
+    assert list(graph.followers_of(1)) == []
+    assert list(graph.followers_of(3)) == [1]
+
+    graph.add(3, 1)
+    graph.build([])
+    assert graph.stats()["edges"] == 0
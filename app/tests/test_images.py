@@ -0,0 +1,30 @@
+from core.images import render_variants
+from PIL import Image, features
+import shutil
+import os
+
+SIZES = {"thumbnail": 64, "medium": 200}
+
+
+def test_render_variants(tmp_path):
+    """Тест уменьшенных копий: размеры и форматы PNG, JPEG и WebP"""
+    os.makedirs(tmp_path / "ab")
+    shutil.copy("media/cat.png", tmp_path / "ab" / "cat.png")
+    with Image.open(tmp_path / "ab" / "cat.png") as image:
+        image.convert("RGB").save(tmp_path / "ab" / "cat.jpg", format="JPEG")
+        original_size = image.size
+
+    cases = [("ab/cat.png", False, ".png", "PNG"), ("ab/cat.jpg", False, ".jpg", "JPEG")]
+    if features.check("webp"):
+        cases.append(("ab/cat.png", True, ".webp", "WEBP"))
+
+    for file_path, webp, extension, image_format in cases:
+        paths = render_variants(str(tmp_path), file_path, SIZES, webp)
+        stem = os.path.splitext(file_path)[0]
+        assert paths == {name: f"{stem}_{name}{extension}" for name in SIZES}
+        for name, max_side in SIZES.items():
+            with Image.open(tmp_path / paths[name]) as variant:
+                assert variant.format == image_format
+                assert max(variant.size) == min(max_side, max(original_size))
+
+    assert not [name for name in os.listdir(tmp_path / "ab") if name.endswith(".tmp")]
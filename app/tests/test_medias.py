@@ -1,4 +1,21 @@
+from sqlalchemy import func, select, update
+from core.media_gc import media_sweeper
+from core.media_files import MediaFiles
+from db.database import async_session_maker
+from datetime import timedelta
+from db import Media, MediaBlob
+from core import settings
+import hashlib
 import pytest
+import os
+
+
+async def get_cat_blob(db) -> MediaBlob:
+    """Блоб media/cat.png по SHA-256: другие тесты могут загрузить свои файлы."""
+    with open("media/cat.png", "rb") as file:
+        digest = hashlib.sha256(file.read()).hexdigest()
+    db.expire_all()
+    return await db.get(MediaBlob, digest)
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -16,3 +33,158 @@ async def test_upload_media(client):
     data = response.json()
     assert data["result"] is True
     assert isinstance(data["media_id"], int)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_media_wrong_signature(client):
+    """Тест отклонения файла, содержимое которого не совпадает с расширением"""
+    response = await client.post(
+        "/api/medias",
+        files={"file": ("fake.png", b"definitely not an image", "image/png")},
+        headers={"api-key": "admin"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_media_deduplicated(client, db):
+    """Тест повторной загрузки того же файла: одна копия на диске, две ссылки"""
+    with open("media/cat.png", "rb") as file:
+        response = await client.post(
+            "/api/medias",
+            files={"file": ("cat.png", file, "image/png")},
+            headers={"api-key": "admin"}
+        )
+    assert response.status_code == 201
+
+    blob = await get_cat_blob(db)
+    assert blob.ref_count == 2
+    assert os.path.exists(os.path.join("media", blob.file_path))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_serve_media_caching(client, db):
+    """Тест раздачи медиа: immutable-кэш, ETag/304 и Range"""
+    url = f"/media/{(await get_cat_blob(db)).file_path}"
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    not_modified = await client.get(url, headers={"if-none-match": etag})
+    assert not_modified.status_code == 304
+
+    partial = await client.get(url, headers={"range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.content == b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sweep_orphaned_media(client, db):
+    """Тест сборщика: старое непривязанное медиа удаляется вместе с файлом, свежее и заблокированное остаются"""
+    with open("media/cat.png", "rb") as file:
+        original = file.read()
+    content = original + os.urandom(64)
+    response = await client.post(
+        "/api/medias",
+        files={"file": ("orphan.png", content, "image/png")},
+        headers={"api-key": "admin"}
+    )
+    media_id = response.json()["media_id"]
+    media = await db.get(Media, media_id)
+    file_path = os.path.join("media", media.file_path)
+    assert os.path.exists(file_path)
+
+    await db.execute(
+        update(Media).where(Media.id == media_id).values(created_at=func.now() - timedelta(days=30))
+    )
+    await db.commit()
+
+    # Медиа, которое прикрепляется к создаваемому твиту, заблокировано и пропускается
+    async with async_session_maker() as locker:
+        await locker.execute(
+            select(Media.id).where(Media.id == media_id).with_for_update(read=True, key_share=True)
+        )
+        assert await media_sweeper.sweep() == 0
+    assert os.path.exists(file_path)
+
+    reclaimed_before = media_sweeper.reclaimed_bytes
+    assert await media_sweeper.sweep() == 1
+    assert media_sweeper.reclaimed_bytes - reclaimed_before >= len(content)
+    assert not os.path.exists(file_path)
+
+    db.expire_all()
+    assert await db.get(Media, media_id) is None
+    assert await db.get(MediaBlob, hashlib.sha256(content).hexdigest()) is None
+    original_blob = await db.get(MediaBlob, hashlib.sha256(original).hexdigest())
+    assert original_blob.ref_count == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_media_too_large(client, monkeypatch):
+    """Тест отказа 413 до разбора формы: по Content-Length и по потоку без него, без дочитывания тела"""
+    monkeypatch.setattr(settings, "MEDIA_MAX_SIZE", 1024)
+    monkeypatch.setattr(settings, "MEDIA_FORM_OVERHEAD", 1024)
+    with open("media/cat.png", "rb") as file:
+        content = file.read()
+
+    response = await client.post(
+        "/api/medias",
+        files={"file": ("cat.png", content, "image/png")},
+        headers={"api-key": "admin"}
+    )
+    assert response.status_code == 413
+
+    chunks = range(0, len(content), 512)
+    sent = []
+
+    async def chunked_body():
+        yield b'--upload\r\nContent-Disposition: form-data; name="file"; filename="cat.png"\r\n'
+        yield b"Content-Type: image/png\r\n\r\n"
+        for start in chunks:
+            sent.append(start)
+            yield content[start:start + 512]
+        yield b"\r\n--upload--\r\n"
+
+    response = await client.post(
+        "/api/medias",
+        content=chunked_body(),
+        headers={"api-key": "admin", "content-type": "multipart/form-data; boundary=upload"}
+    )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
+    assert len(sent) < len(chunks)
+
+
+async def call_media_files(directory, path: str, headers: list) -> list:
+    """Вызывает MediaFiles как ASGI-приложение с расширением pathsend и возвращает отправленные сообщения."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"",
+        "headers": headers, "extensions": {"http.response.pathsend": {}},
+    }
+    await MediaFiles(directory=directory)(scope, receive, send)
+    return messages
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_serve_media_pathsend(tmp_path):
+    """Тест отдачи полного файла через pathsend и Range-запроса через тело ответа"""
+    (tmp_path / "cat.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"0" * 100)
+
+    messages = await call_media_files(tmp_path, "/cat.png", [])
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+    assert messages[1]["path"] == str(tmp_path / "cat.png")
+    assert (b"content-length", b"108") in messages[0]["headers"]
+
+    messages = await call_media_files(tmp_path, "/cat.png", [(b"range", b"bytes=0-7")])
+    assert messages[0]["status"] == 206
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_metrics_endpoint(client):
+    """Тест метрик маршрутов, БД и пула в формате Prometheus"""
+    await client.get("/api/users/me", headers={"api-key": "test"})
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{router="users",route="/api/users/me",method="GET"}' in body
+    assert 'http_requests_total{router="users",route="/api/users/me",method="GET",status="2xx"}' in body
+    assert 'db_queries_total{router="users",route="/api/users/me",method="GET"}' in body
+    assert "http_requests_in_flight 1.0" in body
+    assert 'db_pool_size{engine="primary"} ' in body
@@ -0,0 +1,35 @@
+from starlette.responses import PlainTextResponse
+from httpx import AsyncClient, ASGITransport
+from core.profiling import ProfilingMiddleware
+from core import settings
+import pytest
+import json
+import os
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_profiling_middleware(tmp_path, monkeypatch):
+    """Тест записи профиля speedscope по токену и ограничения числа файлов"""
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_MAX_FILES", 2)
+
+    app = ProfilingMiddleware(PlainTextResponse("ok"))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        plain = await client.get("/")
+        assert "x-profile-id" not in plain.headers
+        assert list(tmp_path.iterdir()) == []
+
+        profile_ids = []
+        for _ in range(3):
+            response = await client.get("/", headers={"x-profile": "secret", "x-request-id": "same-id"})
+            assert response.text == "ok"
+            profile_ids.append(response.headers["x-profile-id"])
+
+    assert len(set(profile_ids)) == 3
+    assert all(profile_id.startswith("same-id-") for profile_id in profile_ids)
+
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    with open(tmp_path / files[0]) as f:
+        assert "speedscope" in json.load(f)["$schema"]
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from tests.conftest import test_engine
+from sqlalchemy import event
+from db import Base
+import pytest
+import json
+import re
+
+
+SEED_SQL = [
+    "INSERT INTO users (name, api_key) SELECT 'seed' || g, 'seed-' || g FROM generate_series(1, 2000) g",
+    """
+    INSERT INTO tweets (user_id, content)
+    SELECT u.id, 'seed tweet ' || g FROM users u, generate_series(1, 20) g WHERE u.api_key LIKE 'seed-%'
+    """,
+    """
+    INSERT INTO follows (follower_id, following_id)
+    SELECT u.id, f.id FROM users u JOIN users f ON f.id BETWEEN u.id + 1 AND u.id + 10
+    WHERE u.api_key LIKE 'seed-%' AND f.api_key LIKE 'seed-%'
+    """,
+    """
+    INSERT INTO likes (user_id, tweet_id)
+    SELECT u.id, t.id FROM users u JOIN tweets t ON t.user_id = u.id + 1
+    WHERE u.api_key LIKE 'seed-%'
+    """,
+    "ANALYZE",
+]
+
+
+@contextmanager
+def captured_statements():
+    """Собирает SQL, выполненный приложением, вместе с параметрами."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+# Индексы горячих путей: имя индекса -> (таблица, ведущая колонка). Каждый должен
+# встретиться в планах с условием Index Cond на ведущую колонку.
+EXPECTED_INDEXES = {
+    "timelines_pkey": ("timelines", "user_id"),
+    "ix_follows_following_id_follower_id": ("follows", "following_id"),
+    "follows_pkey": ("follows", "follower_id"),
+    "ix_likes_tweet_id_user_id": ("likes", "tweet_id"),
+    "likes_pkey": ("likes", "user_id"),
+    "tweets_pkey": ("tweets", "id"),
+}
+
+# Таблицы, растущие как произведение пользователей на подписки или твиты:
+# их индекс нельзя читать целиком, даже если это не Seq Scan
+FAN_OUT_TABLES = {"timelines", "follows", "likes", "tweets_medias"}
+
+
+def scan_nodes(plan: dict) -> list:
+    """Возвращает все узлы плана, читающие таблицу или индекс."""
+    found = []
+    if "Relation Name" in plan or "Index Name" in plan:
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(scan_nodes(child))
+    return found
+
+
+def index_table(node: dict) -> str:
+    """Таблица узла; у Bitmap Index Scan ее нет в плане, она берется по имени индекса."""
+    if "Relation Name" in node:
+        return node["Relation Name"]
+    for table in Base.metadata.tables.values():
+        if node["Index Name"] == f"{table.name}_pkey" or node["Index Name"] in {index.name for index in table.indexes}:
+            return table.name
+    return node["Index Name"]
+
+
+async def assert_index_scans(statements: list) -> None:
+    """
+    Выполняет EXPLAIN для каждого запроса на заполненной БД и проверяет планы.
+
+    Seq Scan запрещен через enable_seqscan = off, поэтому одного его отсутствия
+    мало: планировщик возьмет любой индекс, даже неподходящий и прочитанный
+    целиком. Поэтому проверяется, что:
+    - в планах нет Seq Scan;
+    - узлы на таблицах из FAN_OUT_TABLES читают индекс с условием Index Cond;
+    - каждый индекс из EXPECTED_INDEXES используется с Index Cond на ведущую колонку.
+
+    Данные откатываются после проверки.
+    """
+    used = {}
+    async with test_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            for sql in SEED_SQL:
+                await conn.exec_driver_sql(sql)
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            for statement, parameters in statements:
+                if statement.lstrip().upper().startswith("INSERT") and " VALUES " in statement.upper():
+                    continue
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = result.scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+
+                for node in scan_nodes(plan[0]["Plan"]):
+                    assert node["Node Type"] != "Seq Scan", (
+                        f"Sequential scan on {node['Relation Name']} in plan of: {statement}"
+                    )
+                    if node["Node Type"] == "Bitmap Heap Scan":
+                        continue
+                    index_name = node.get("Index Name")
+                    if index_table(node) in FAN_OUT_TABLES:
+                        assert "Index Cond" in node, (
+                            f"Full scan of index {index_name} in plan of: {statement}"
+                        )
+                    if "Index Cond" in node:
+                        used.setdefault(index_name, []).append(node["Index Cond"])
+        finally:
+            await transaction.rollback()
+
+    for index_name, (table, column) in EXPECTED_INDEXES.items():
+        conditions = used.get(index_name, [])
+        assert conditions, f"Index {index_name} on {table} is not used by hot path queries"
+        assert any(re.search(rf"\(({table}(_\d+)?\.)?{column} ", condition) for condition in conditions), (
+            f"Index {index_name} is used without condition on {column}: {conditions}"
+        )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hot_path_query_plans(client):
+    """Тест планов запросов ленты, профиля, лайка и удаления твита"""
+    await client.post("/api/users/1/follow", headers={"api-key": "admin"})
+    tweet_res = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Plan probe"},
+        headers={"api-key": "test"}
+    )
+    tweet_id = tweet_res.json()["tweet_id"]
+
+    with captured_statements() as statements:
+        await client.post(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "admin"})
+        feed_res = await client.get("/api/tweets", headers={"api-key": "admin"})
+        profile_res = await client.get("/api/users/1", headers={"api-key": "admin"})
+        counts_res = await client.get("/api/users/1?mode=counts", headers={"api-key": "admin"})
+        await client.delete(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "admin"})
+        delete_res = await client.delete(f"/api/tweets/{tweet_id}", headers={"api-key": "test"})
+
+    await client.delete("/api/users/1/follow", headers={"api-key": "admin"})
+
+    assert "Plan probe" in [tweet["content"] for tweet in feed_res.json()["tweets"]]
+    assert profile_res.status_code == 200
+    assert counts_res.status_code == 200
+    assert delete_res.status_code == 200
+    await assert_index_scans(statements)
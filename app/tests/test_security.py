@@ -0,0 +1,22 @@
+from core import auth_cache
+import pytest
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_auth_cache_hit(client):
+    """Тест кэширования пользователя по API-ключу"""
+    auth_cache.pop("test")
+    await client.get("/api/users/me", headers={"api-key": "test"})
+    hits_before = auth_cache.hits
+
+    response = await client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.status_code == 200
+    assert auth_cache.hits == hits_before + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_invalid_api_key(client):
+    """Тест отказа в доступе по неизвестному ключу"""
+    response = await client.get("/api/users/me", headers={"api-key": "unknown"})
+    assert response.status_code == 401
+    assert auth_cache.get("unknown") is None
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_service_stats(client):
+    """Тест статистики пула соединений, кэша аутентификации и фоновых компонентов"""
+    await client.get("/api/stats", headers={"api-key": "test"})
+    response = await client.get("/api/stats", headers={"api-key": "test"})
+    assert response.status_code == 200
+    data = response.json()
+    assert "checked_out" in data["pool"]
+    assert "replica_pools" in data
+    assert data["auth_cache"]["hits"] >= 1
+    assert {"follow_graph", "like_buffer", "media_gc"} <= data.keys()
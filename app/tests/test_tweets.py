@@ -1,4 +1,10 @@
+from sqlalchemy import select
+from db import Tweet, like_buffer
+from core.serialization import encode_tweet, tweet_fragments
+from types import SimpleNamespace
+from core import settings
 import pytest
+import importlib
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -66,3 +72,121 @@ async def test_like_unlike_tweet(client, test_user):
     )
     assert like_res.status_code == 201
     assert like_res.json()["result"] is True
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_search_tweets(client):
+    """Тест полнотекстового поиска по твитам"""
+    response = await client.get(
+        "/api/tweets/search",
+        params={"q": "kak"},
+        headers={"api-key": "test"}
+    )
+    assert response.status_code == 200
+    contents = [tweet["content"] for tweet in response.json()["tweets"]]
+    assert "O kak!" in contents
+    assert "To like" not in contents
+
+    empty = await client.get(
+        "/api/tweets/search",
+        params={"q": "nothing-like-this"},
+        headers={"api-key": "test"}
+    )
+    assert empty.json()["tweets"] == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_like_write_behind(client, db, monkeypatch):
+    """Тест отложенной пакетной записи лайков"""
+    tweet_res = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Buffered likes"},
+        headers={"api-key": "test"}
+    )
+    tweet_id = tweet_res.json()["tweet_id"]
+
+    monkeypatch.setattr(settings, "LIKE_WRITE_BEHIND", True)
+    for method in ("post", "delete", "post"):
+        response = await client.request(method, f"/api/tweets/{tweet_id}/likes", headers={"api-key": "admin"})
+        assert response.json()["result"] is True
+    assert like_buffer.pending == {(2, tweet_id): True}
+
+    missing = await client.post("/api/tweets/999999/likes", headers={"api-key": "admin"})
+    assert missing.status_code == 404
+    assert (2, 999999) not in like_buffer.pending
+
+    assert await like_buffer.flush() == 1
+
+    result = await db.execute(select(Tweet.likes_count).where(Tweet.id == tweet_id))
+    assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_like_write_behind_retry(client, db, monkeypatch):
+    """Тест повтора пакета лайков после ошибки записи"""
+    tweet_res = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Flaky flush"},
+        headers={"api-key": "test"}
+    )
+    tweet_id = tweet_res.json()["tweet_id"]
+
+    async def failing_apply(session, deltas):
+        raise ConnectionError("database is gone")
+
+    like_buffer_module = importlib.import_module("db.like_buffer")
+    monkeypatch.setattr(like_buffer_module, "_apply_deltas", failing_apply)
+    like_buffer.enqueue(2, tweet_id, True)
+    assert await like_buffer.flush() == 0
+    assert like_buffer.pending == {(2, tweet_id): True}
+    assert like_buffer.stats()["retrying"] == 1
+    assert like_buffer.backoff() > settings.LIKE_FLUSH_INTERVAL
+
+    monkeypatch.undo()
+    assert await like_buffer.flush() == 1
+    assert like_buffer.stats()["retrying"] == 0
+    assert like_buffer.backoff() == settings.LIKE_FLUSH_INTERVAL
+
+    result = await db.execute(select(Tweet.likes_count).where(Tweet.id == tweet_id))
+    assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_idempotent_writes(client, db):
+    """Тест повторных лайков и кодов ответа при удалении чужого и несуществующего твита"""
+    tweet_res = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Retry me"},
+        headers={"api-key": "test"}
+    )
+    tweet_id = tweet_res.json()["tweet_id"]
+
+    for _ in range(2):
+        like_res = await client.post(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "admin"})
+        assert like_res.status_code == 201
+    result = await db.execute(select(Tweet.likes_count).where(Tweet.id == tweet_id))
+    assert result.scalar_one() == 1
+
+    missing_like = await client.post("/api/tweets/999999/likes", headers={"api-key": "admin"})
+    assert missing_like.status_code == 404
+
+    foreign_delete = await client.delete(f"/api/tweets/{tweet_id}", headers={"api-key": "admin"})
+    assert foreign_delete.status_code == 403
+
+    own_delete = await client.delete(f"/api/tweets/{tweet_id}", headers={"api-key": "test"})
+    assert own_delete.status_code == 200
+
+    missing_delete = await client.delete(f"/api/tweets/{tweet_id}", headers={"api-key": "test"})
+    assert missing_delete.status_code == 404
+
+
+def test_tweet_fragment_key_ignores_like_order():
+    """Тест одного фрагмента для твита с тем же набором лайков в другом порядке"""
+    first, second = SimpleNamespace(id=1, name="test"), SimpleNamespace(id=2, name="admin")
+    tweet = SimpleNamespace(id=10 ** 9, content="Fragment", user_id=1, liked_by=[second, first])
+    tweet_fragments.clear()
+
+    fragment = encode_tweet(tweet, "test", [])
+    tweet.liked_by = [first, second]
+    assert encode_tweet(tweet, "test", []) is fragment
+    assert b'"likes":[{"user_id":1,"name":"test"},{"user_id":2,"name":"admin"}]' in fragment
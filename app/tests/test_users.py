@@ -1,4 +1,11 @@
+from core.graph import follow_graph, load_follow_graph
+from endpoints.users import load_profile, profile_response
+from core import encode_cursor, settings
+from schemas import UserResponse
+from sqlalchemy import func, select
+from db import Follow, User
 import pytest
+import json
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -18,6 +25,105 @@ async def test_follow_user(client, db):
     assert follow_res_2.json()["result"] is True
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_follow_idempotent(client, db):
+    """Тест повторной подписки и подписки на несуществующего пользователя"""
+    repeat_res = await client.post("/api/users/2/follow", headers={"api-key": "test"})
+    assert repeat_res.status_code == 200
+    assert repeat_res.json()["result"] is True
+
+    result = await db.execute(select(User.followers_count).where(User.id == 2))
+    assert result.scalar_one() == 1
+    result = await db.execute(select(func.count()).select_from(Follow).where(Follow.follower_id == 1))
+    assert result.scalar_one() == 1
+
+    missing_res = await client.post("/api/users/999/follow", headers={"api-key": "test"})
+    assert missing_res.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feed_after_follow(client):
+    """Тест наполнения ленты: старые твиты при подписке и новые при публикации"""
+    create_res = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Fresh from admin"},
+        headers={"api-key": "admin"}
+    )
+    assert create_res.status_code == 201
+
+    feed_res = await client.get("/api/tweets", headers={"api-key": "test"})
+    assert feed_res.status_code == 200
+    contents = {tweet["content"] for tweet in feed_res.json()["tweets"]}
+    assert "O kak!" in contents
+    assert "Fresh from admin" in contents
+    assert "First tweet!" not in contents
+
+    original_res = await client.get(
+        "/api/tweets",
+        params={"media_size": "original"},
+        headers={"api-key": "test"}
+    )
+    with_media = [t for t in original_res.json()["tweets"] if t["content"] == "O kak!"]
+    assert with_media[0]["attachments"][0].endswith(".png")
+    assert "_medium" not in with_media[0]["attachments"][0]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feed_pagination(client):
+    """Тест курсорной пагинации ленты"""
+    first_page = await client.get(
+        "/api/tweets",
+        params={"limit": 1},
+        headers={"api-key": "test"}
+    )
+    first_data = first_page.json()
+    assert len(first_data["tweets"]) == 1
+    assert first_data["next_cursor"]
+
+    second_page = await client.get(
+        "/api/tweets",
+        params={"limit": 1, "cursor": first_data["next_cursor"]},
+        headers={"api-key": "test"}
+    )
+    second_data = second_page.json()
+    assert len(second_data["tweets"]) == 1
+    assert second_data["tweets"][0]["id"] != first_data["tweets"][0]["id"]
+
+    bad_cursor = await client.get(
+        "/api/tweets",
+        params={"cursor": "not-a-cursor"},
+        headers={"api-key": "test"}
+    )
+    assert bad_cursor.status_code == 400
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_feed_orders(client):
+    """Тест хронологической и ранжированной ленты"""
+    recent = await client.get(
+        "/api/tweets",
+        params={"order": "recent"},
+        headers={"api-key": "test"}
+    )
+    ids = [tweet["id"] for tweet in recent.json()["tweets"]]
+    assert ids == sorted(ids, reverse=True)
+
+    ranked = await client.get(
+        "/api/tweets",
+        params={"order": "ranked", "limit": 1},
+        headers={"api-key": "test"}
+    )
+    ranked_data = ranked.json()
+    assert len(ranked_data["tweets"]) == 1
+
+    next_page = await client.get(
+        "/api/tweets",
+        params={"order": "ranked", "cursor": ranked_data["next_cursor"]},
+        headers={"api-key": "test"}
+    )
+    assert ranked_data["tweets"][0]["id"] not in [tweet["id"] for tweet in next_page.json()["tweets"]]
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_user_profile(client):
     """Тест получения профиля текущего пользователя"""
@@ -29,6 +135,8 @@ async def test_get_user_profile(client):
     data = response.json()
     assert data["result"] is True
     assert data["user"]["name"] == "test"
+    assert int(response.headers["X-DB-Queries"]) >= 1
+    assert int(response.headers["X-DB-Rows"]) >= 1
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -39,4 +147,148 @@ async def test_get_other_user_profile(client, db):
         headers={"api-key": "test"}
     )
     assert response.status_code == 200
-    assert response.json()["user"]["name"] == "admin"
+    user = response.json()["user"]
+    assert user["name"] == "admin"
+    assert user["followers_count"] == len(user["followers"]) == 1
+    assert user["following_count"] == len(user["following"]) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_follow_lists_pagination(client):
+    """Тест постраничных списков подписчиков и подписок"""
+    response = await client.get("/api/users/2/followers", params={"limit": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["users"] == [{"id": 1, "name": "test"}]
+    assert data["next_cursor"] is None
+
+    response = await client.get("/api/users/1/following")
+    assert response.json()["users"] == [{"id": 2, "name": "admin"}]
+
+    response = await client.get("/api/users/999/followers")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_profile_counts_mode(client):
+    """Тест профиля без полных списков подписчиков"""
+    response = await client.get("/api/users/2", params={"mode": "counts"})
+    user = response.json()["user"]
+    assert user["followers_count"] == 1
+    assert user["followers"] == [] and user["following"] == []
+
+    response = await client.get("/api/users/2", params={"mode": "counts", "preview": 5})
+    assert response.json()["user"]["followers"] == [{"id": 1, "name": "test"}]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_mutuals(client):
+    """Тест списка взаимных подписок, курсора и 404 для несуществующего пользователя"""
+    response = await client.get("/api/users/1/mutuals")
+    assert response.status_code == 200
+    assert response.json()["users"] == [{"id": 2, "name": "admin"}]
+    assert response.json()["next_cursor"] is None
+
+    after = await client.get("/api/users/1/mutuals", params={"cursor": encode_cursor(2)})
+    assert after.status_code == 200
+    assert after.json()["users"] == []
+
+    missing = await client.get("/api/users/999999/mutuals")
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_conditional_get(client):
+    """Тест ETag и 304 для ленты и профиля и смены ETag после записи"""
+    feed = await client.get("/api/tweets", headers={"api-key": "test"})
+    feed_etag = feed.headers["etag"]
+    assert feed.headers["vary"] == "api-key"
+
+    cached = await client.get("/api/tweets", headers={"api-key": "test", "if-none-match": feed_etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    other_order = await client.get(
+        "/api/tweets", params={"order": "recent"}, headers={"api-key": "test", "if-none-match": feed_etag}
+    )
+    assert other_order.status_code == 200
+
+    profile = await client.get("/api/users/2")
+    profile_etag = profile.headers["etag"]
+    assert (await client.get("/api/users/2", headers={"if-none-match": profile_etag})).status_code == 304
+
+    tweet_id = feed.json()["tweets"][0]["id"]
+    await client.post(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "test"})
+    await client.delete(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "test"})
+    liked = await client.get("/api/tweets", headers={"api-key": "test", "if-none-match": feed_etag})
+    assert liked.status_code == 200
+    assert liked.headers["etag"] != feed_etag
+
+    await client.post("/api/tweets", json={"tweet_data": "New for etag"}, headers={"api-key": "admin"})
+    changed = await client.get("/api/users/2", headers={"if-none-match": profile_etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != profile_etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_follow_graph_matches_db(client, db):
+    """Тест графа подписок, загруженного из БД: связи, взаимные подписки и обновления"""
+    async def db_edges():
+        result = await db.execute(select(Follow.follower_id, Follow.following_id))
+        return set(result.all())
+
+    await load_follow_graph()
+    try:
+        edges = await db_edges()
+        assert edges
+        for follower_id in (1, 2):
+            for following_id in (1, 2):
+                assert follow_graph.is_following(follower_id, following_id) == ((follower_id, following_id) in edges)
+        assert follow_graph.mutuals(1) == [2]
+
+        response = await client.get("/api/users/1/mutuals")
+        assert response.json()["users"] == [{"id": 2, "name": "admin"}]
+        after = await client.get("/api/users/1/mutuals", params={"cursor": encode_cursor(2)})
+        assert after.json()["users"] == []
+        assert (await client.get("/api/users/999999/mutuals")).status_code == 404
+
+        await client.delete("/api/users/2/follow", headers={"api-key": "test"})
+        assert not follow_graph.is_following(1, 2)
+        assert (1, 2) not in await db_edges()
+        assert follow_graph.mutuals(1) == []
+
+        await client.post("/api/users/2/follow", headers={"api-key": "test"})
+        assert follow_graph.is_following(1, 2)
+        assert (1, 2) in await db_edges()
+        assert list(follow_graph.followers_of(2)) == [1]
+    finally:
+        follow_graph.build([])
+        follow_graph.loaded = False
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cursor_value_types(client):
+    """Тест отказа 400 для курсора с неверными типами значений"""
+    for cursor in (encode_cursor("a", "b"), encode_cursor(2 ** 40, 1), encode_cursor(True, 1)):
+        response = await client.get("/api/tweets", params={"cursor": cursor}, headers={"api-key": "test"})
+        assert response.status_code == 400
+
+    response = await client.get("/api/users/1/following", params={"cursor": encode_cursor("x")})
+    assert response.status_code == 400
+
+    response = await client.get(
+        "/api/tweets/search",
+        params={"q": "tweet", "cursor": encode_cursor("high", 1)},
+        headers={"api-key": "test"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_profile_response_matches_schema(db, monkeypatch):
+    """Тест совпадения быстрого ответа профиля с UserResponse"""
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    for mode, preview in (("full", 0), ("counts", 5)):
+        profile = await load_profile(db, 1, mode, preview)
+        body = json.loads(profile_response(profile).body)
+        assert body == UserResponse.model_validate({"user": profile}).model_dump(mode="json")
@@ -0,0 +1,4 @@
+"""
+Пакет `tools` содержит служебные утилиты:
+- generate_data.py: генерация синтетических данных и загрузка через COPY
+"""
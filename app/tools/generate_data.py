@@ -0,0 +1,272 @@
+"""
+Генератор синтетических данных в масштабе продакшена.
+
+Строит граф подписок со степенным распределением (немногие пользователи
+собирают большинство подписчиков), твиты, лайки и медиа и загружает их через
+asyncpg COPY пачками, не держа весь набор в памяти. При одинаковом --seed
+результат воспроизводится полностью, включая даты твитов.
+
+ID назначаются явно после текущих максимальных, поэтому данные можно
+догружать в непустую БД. Счетчики, рейтинг твитов, ref_count файлов
+и домашние ленты пересчитываются SQL-запросами после загрузки.
+
+API-ключ каждого сгенерированного пользователя - `user<id>`.
+Файлы медиа на диск не пишутся: строки ссылаются на несуществующие пути.
+
+Запуск из каталога app:
+    python -m tools.generate_data --users 1000000 --avg-follows 50 --tweets-per-user 20 --seed 42
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List
+from core import settings
+from itertools import accumulate, islice
+from array import array
+import argparse
+import asyncpg
+import asyncio
+import hashlib
+import random
+import time
+
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua fastapi postgres python feed like "
+    "follow tweet media photo news today weekend coffee music travel code release"
+).split()
+
+TABLES = ("timelines", "likes", "tweets_medias", "follows", "tweets", "medias", "media_blobs", "users")
+
+
+def power_law(rnd: random.Random, mean: float, alpha: float, maximum: int) -> int:
+    """
+    Случайное число с распределением Парето, смещенным к нулю, со средним около `mean`.
+    """
+    value = (rnd.paretovariate(alpha) - 1) * (alpha - 1) * mean
+    return min(int(value), maximum)
+
+
+def batched(records: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def copy(conn: asyncpg.Connection, table: str, columns: List[str], records: Iterable[tuple], batch_size: int) -> int:
+    """
+    Загружает записи в таблицу через COPY пачками по batch_size.
+
+    Returns:
+        int: Число загруженных строк
+    """
+    started_at = time.perf_counter()
+    total = 0
+    for batch in batched(records, batch_size):
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        total += len(batch)
+    print(f"{table:<14} {total:>12,} rows  {time.perf_counter() - started_at:8.1f} s")
+    return total
+
+
+async def max_id(conn: asyncpg.Connection, table: str) -> int:
+    return await conn.fetchval(f"SELECT coalesce(max(id), 0) FROM {table}")
+
+
+class Generator:
+    """
+    Детерминированный генератор строк. Каждая таблица использует свой поток
+    случайных чисел, поэтому изменение одного параметра не сдвигает остальные.
+    """
+
+    def __init__(self, args: argparse.Namespace, user_base: int, tweet_base: int, media_base: int) -> None:
+        self.args = args
+        self.user_base = user_base
+        self.tweet_base = tweet_base
+        self.media_base = media_base
+        self.end = datetime.fromisoformat(args.end_date).replace(tzinfo=timezone.utc)
+        self.span = timedelta(days=args.days)
+
+        rnd = random.Random(f"{args.seed}:popularity")
+        self.by_popularity = array("l", range(user_base + 1, user_base + args.users + 1))
+        rnd.shuffle(self.by_popularity)
+        self.cum_weights = list(accumulate(1 / (rank + 1) ** args.follow_alpha for rank in range(args.users)))
+
+        rnd = random.Random(f"{args.seed}:authors")
+        self.authors = array("l")
+        for user_id in range(user_base + 1, user_base + args.users + 1):
+            count = power_law(rnd, args.tweets_per_user, args.tweet_alpha, args.max_tweets_per_user)
+            self.authors.extend([user_id] * count)
+        rnd.shuffle(self.authors)
+
+    def users(self) -> Iterator[tuple]:
+        for user_id in range(self.user_base + 1, self.user_base + self.args.users + 1):
+            yield user_id, f"user{user_id}", f"user{user_id}"
+
+    def follows(self) -> Iterator[tuple]:
+        rnd = random.Random(f"{self.args.seed}:follows")
+        max_follows = min(self.args.max_follows, self.args.users - 1)
+        for user_id in range(self.user_base + 1, self.user_base + self.args.users + 1):
+            count = power_law(rnd, self.args.avg_follows, self.args.follows_alpha, max_follows)
+            if not count:
+                continue
+            chosen = set(rnd.choices(self.by_popularity, cum_weights=self.cum_weights, k=count))
+            chosen.discard(user_id)
+            for following_id in sorted(chosen):
+                yield user_id, following_id
+
+    def tweets(self) -> Iterator[tuple]:
+        rnd = random.Random(f"{self.args.seed}:tweets")
+        total = len(self.authors)
+        start = self.end - self.span
+        for index, user_id in enumerate(self.authors):
+            created_at = start + self.span * ((index + rnd.random()) / total)
+            content = " ".join(rnd.choices(WORDS, k=rnd.randint(3, 30)))
+            yield self.tweet_base + index + 1, user_id, content, created_at
+
+    def media_blobs(self) -> Iterator[tuple]:
+        for index in range(self.args.blobs):
+            digest = hashlib.sha256(f"{self.args.seed}:blob:{index}".encode()).hexdigest()
+            yield digest, f"{digest[:2]}/{digest}.jpg", 100_000 + index % 900_000
+
+    def medias(self) -> Iterator[tuple]:
+        rnd = random.Random(f"{self.args.seed}:medias")
+        blobs = [digest for digest, _, _ in self.media_blobs()]
+        media_id = self.media_base
+        for index in range(len(self.authors)):
+            if rnd.random() >= self.args.media_ratio:
+                continue
+            media_id += 1
+            digest = rnd.choice(blobs)
+            yield media_id, f"{digest[:2]}/{digest}.jpg", digest, self.tweet_base + index + 1
+
+    def likes(self) -> Iterator[tuple]:
+        rnd = random.Random(f"{self.args.seed}:likes")
+        user_count = self.args.users
+        for index in range(len(self.authors)):
+            count = power_law(rnd, self.args.avg_likes, self.args.likes_alpha, min(self.args.max_likes, user_count))
+            likers = {self.user_base + rnd.randrange(user_count) + 1 for _ in range(count)}
+            tweet_id = self.tweet_base + index + 1
+            for user_id in sorted(likers):
+                yield user_id, tweet_id
+
+
+async def finalize(conn: asyncpg.Connection, skip_timelines: bool) -> None:
+    """
+    Пересчитывает денормализованные данные и статистику планировщика.
+    """
+    half_life = settings.FEED_RANK_HALF_LIFE_HOURS * 3600
+    statements = [
+        ("users.followers_count", """
+            UPDATE users u SET followers_count = c.n
+            FROM (SELECT following_id, count(*) AS n FROM follows GROUP BY following_id) c
+            WHERE u.id = c.following_id
+        """),
+        ("users.following_count", """
+            UPDATE users u SET following_count = c.n
+            FROM (SELECT follower_id, count(*) AS n FROM follows GROUP BY follower_id) c
+            WHERE u.id = c.follower_id
+        """),
+        ("users.tweets_count", """
+            UPDATE users u SET tweets_count = c.n
+            FROM (SELECT user_id, count(*) AS n FROM tweets GROUP BY user_id) c
+            WHERE u.id = c.user_id
+        """),
+        ("tweets.likes_count", """
+            UPDATE tweets t SET likes_count = c.n
+            FROM (SELECT tweet_id, count(*) AS n FROM likes GROUP BY tweet_id) c
+            WHERE t.id = c.tweet_id
+        """),
+        ("tweets.score", f"""
+            UPDATE tweets SET score =
+                ln(likes_count + 1) / ln(2) + extract(epoch FROM created_at)::float8 / {half_life}
+        """),
+        ("media_blobs.ref_count", """
+            UPDATE media_blobs b SET ref_count = c.n
+            FROM (SELECT digest, count(*) AS n FROM medias GROUP BY digest) c
+            WHERE b.digest = c.digest
+        """),
+    ]
+    if not skip_timelines:
+        statements.append(("timelines", f"""
+            INSERT INTO timelines (user_id, tweet_id)
+            SELECT user_id, tweet_id FROM (
+                SELECT f.follower_id AS user_id, t.id AS tweet_id,
+                       row_number() OVER (PARTITION BY f.follower_id ORDER BY t.id DESC) AS position
+                FROM follows f JOIN tweets t ON t.user_id = f.following_id
+            ) recent
+            WHERE position <= {settings.TIMELINE_MAX_SIZE}
+            ON CONFLICT DO NOTHING
+        """))
+    for table in ("users", "tweets", "medias"):
+        statements.append((f"{table}.id sequence", f"""
+            SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}
+        """))
+    statements.append(("analyze", "ANALYZE"))
+
+    for name, sql in statements:
+        started_at = time.perf_counter()
+        await conn.execute(sql)
+        print(f"{name:<24} {time.perf_counter() - started_at:8.1f} s")
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(settings.ASYNC_DATABASE_URL.replace("postgresql+asyncpg", "postgresql"))
+    try:
+        await conn.execute("SET synchronous_commit = off")
+        if args.truncate:
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+
+        generator = Generator(
+            args,
+            user_base=await max_id(conn, "users"),
+            tweet_base=await max_id(conn, "tweets"),
+            media_base=await max_id(conn, "medias"),
+        )
+        batch = args.batch_size
+
+        await copy(conn, "users", ["id", "name", "api_key"], generator.users(), batch)
+        await copy(conn, "follows", ["follower_id", "following_id"], generator.follows(), batch)
+        await copy(conn, "tweets", ["id", "user_id", "content", "created_at"], generator.tweets(), batch)
+        if args.blobs and args.media_ratio:
+            await copy(conn, "media_blobs", ["digest", "file_path", "size"], generator.media_blobs(), batch)
+            # medias() детерминирован по seed, поэтому второй проход дает те же строки
+            # и список медиа не нужно держать в памяти
+            await copy(conn, "medias", ["id", "file_path", "digest"], (row[:3] for row in generator.medias()), batch)
+            await copy(
+                conn, "tweets_medias", ["media_id", "tweet_id"], ((row[0], row[3]) for row in generator.medias()), batch
+            )
+        await copy(conn, "likes", ["user_id", "tweet_id"], generator.likes(), batch)
+
+        await finalize(conn, args.skip_timelines)
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic data generator and COPY bulk loader")
+    parser.add_argument("--users", type=int, default=100_000, help="число пользователей")
+    parser.add_argument("--avg-follows", type=float, default=50, help="среднее число подписок")
+    parser.add_argument("--max-follows", type=int, default=5000, help="максимум подписок у пользователя")
+    parser.add_argument("--follows-alpha", type=float, default=1.5, help="хвост распределения числа подписок")
+    parser.add_argument("--follow-alpha", type=float, default=1.0, help="степень Ципфа популярности авторов")
+    parser.add_argument("--tweets-per-user", type=float, default=20, help="среднее число твитов")
+    parser.add_argument("--max-tweets-per-user", type=int, default=10_000, help="максимум твитов у пользователя")
+    parser.add_argument("--tweet-alpha", type=float, default=1.5, help="хвост распределения числа твитов")
+    parser.add_argument("--avg-likes", type=float, default=5, help="среднее число лайков на твит")
+    parser.add_argument("--max-likes", type=int, default=100_000, help="максимум лайков на твит")
+    parser.add_argument("--likes-alpha", type=float, default=1.3, help="хвост распределения лайков")
+    parser.add_argument("--media-ratio", type=float, default=0.1, help="доля твитов с медиа")
+    parser.add_argument("--blobs", type=int, default=10_000, help="число различных файлов медиа")
+    parser.add_argument("--days", type=int, default=365, help="период публикации твитов")
+    parser.add_argument("--end-date", default="2026-10-01", help="дата последнего твита (ISO)")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="строк в одном COPY")
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед загрузкой")
+    parser.add_argument("--skip-timelines", action="store_true", help="не строить домашние ленты")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()